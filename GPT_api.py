@@ -1,72 +1,171 @@
-import openai
-import os
-import tiktoken
-from openai import OpenAI
+import json
+from llm_backend import LLM_MODEL, get_client
+from prompt_budget import PromptBudget, count_tokens, count_message_tokens
+from rate_limiter import DEFAULT_COMPLETION_TOKENS, get_rate_limiter
+from response_cache import CachePolicy, NO_CACHE, DAY, get_cached_response, store_response, delete_response
+from scenario_stages import parse_scenario, detect_target_stages, stage_outline, replace_stages
 
-# API key setup
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", "API_KEY"))
+
+# 환자 개요와 간호 시나리오 단계의 목차 (여러 서비스가 같은 형식을 요청한다)
+PATIENT_OVERVIEW_TEMPLATE = (
+    "환자 개요(Brief description of client):\n"
+    "◦ 질병명(Disease Name):\n"
+    "◦ 목적(Purpose):\n"
+    "◦ 이름(Name):\n"
+    "◦ 성별(Gender):\n"
+    "◦ 나이(Age):\n"
+    "◦ 키(Height):\n"
+    "◦ 몸무게(Weight):\n"
+    "◦ 주호소(Chief complaint):\n"
+    "◦ 입원경로(History of present illness):\n"
+    "◦ 사회력(Social history):\n"
+    "◦ 과거질병력(Past medical history):\n"
+    "◦ 과거수술력(Past surgical history & date):\n"
+    "◦ 가족력(Family medical history):\n"
+    "◦ 약물(Medication):\n"
+    "◦ 1차 진단명(Primary diagnosis):\n"
+)
+SCENARIO_STAGES_TEMPLATE = (
+    "1. Initial Stage:\n"
+    "  - 환자 상태: [환자의 상태 설명]\n"
+    "  - 예상 간호 중재: [예상 간호 중재 설명]\n"
+    "  - 교육 포인트: [교육 포인트 설명]\n"
+    "2. 1st state/interval:\n"
+    "  - 환자 상태: [환자의 상태 설명]\n"
+    "  - 예상 간호 중재: [예상 간호 중재 설명]\n"
+    "  - 교육 포인트: [교육 포인트 설명]\n"
+    "3. 2nd state/interval:\n"
+    "  - 환자 상태: [환자의 상태 설명]\n"
+    "  - 예상 간호 중재: [예상 간호 중재 설명]\n"
+    "  - 교육 포인트: [교육 포인트 설명]\n"
+    "4. 3rd state/interval:\n"
+    "  - 환자 상태: [환자의 상태 설명]\n"
+    "  - 예상 간호 중재: [예상 간호 중재 설명]\n"
+    "  - 교육 포인트: [교육 포인트 설명]\n"
+)
 
 
 def num_tokens_from_string(string: str, encoding_name: str) -> int:
-    encoding = tiktoken.get_encoding(encoding_name)
-    num_tokens = len(encoding.encode(string))
-    return num_tokens
+    return count_tokens(string, encoding_name)
 
 class OpenAIService:
+    model = LLM_MODEL
+    cache_policy = NO_CACHE
+
     def __init__(self):
-        self.client = openai  # openai 모듈을 client로 사용합니다.
+        self.client = get_client()  # LLM_BACKEND 설정에 따른 OpenAI 호환 클라이언트
+        self.last_token_counts = None  # 마지막으로 만든 프롬프트의 섹션별 토큰 수
+
+    def _estimate_tokens(self, messages, params):
+        # 분당 토큰 한도에서 미리 빼 둘 양: 프롬프트 토큰 + 최대 응답 토큰
+        return count_message_tokens(messages) + params.get("max_tokens", DEFAULT_COMPLETION_TOKENS)
+
+    def _budget_messages(self, system_content, budget):
+        """ 시스템 메시지 몫을 뺀 예산 안에서 사용자 프롬프트를 만들어 메시지 목록을 반환한다. """
+        reserved_tokens = count_message_tokens([
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": ""}
+        ])
+        prompt_message, self.last_token_counts = budget.build(reserved_tokens)
+        return [
+            {"role": "system", "content": system_content},
+            {"role": "user", "content": prompt_message}
+        ]
+
+    def _chat_completion(self, messages, validate=None, **params):
+        """ 응답 텍스트를 반환한다. validate(응답)가 ValueError를 내는 응답은 캐시에 저장하지 않는다. """
+        # 같은 모델/메시지/파라미터의 응답이 캐시에 있으면 API를 호출하지 않는다
+        key, cached = get_cached_response(self.cache_policy, self.model, messages, params)
+        if cached is not None:
+            try:
+                if validate is not None:
+                    validate(cached)
+                return cached
+            except ValueError:
+                # 검증 전에 저장된 잘못된 응답은 지우고 다시 요청한다
+                delete_response(key)
+
+        chat_completion = get_rate_limiter().call(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                **params
+            ),
+            self._estimate_tokens(messages, params),
+            usage_tokens=lambda completion: completion.usage.total_tokens if completion.usage else None
+        )
+        response_content = chat_completion.choices[0].message.content.strip()
+        if validate is not None:
+            validate(response_content)
+        store_response(key, response_content)
+        return response_content
+
+    def _chat_completion_stream(self, messages, **params):
+        """ 응답 텍스트 조각을 도착하는 대로 yield 한다. 끝나면 전체 응답을 캐시에 저장한다. """
+        key, cached = get_cached_response(self.cache_policy, self.model, messages, params)
+        if cached is not None:
+            yield cached
+            return
+
+        stream = get_rate_limiter().stream(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                stream=True,
+                **params
+            ),
+            self._estimate_tokens(messages, params)
+        )
+        chunks = []
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                chunks.append(delta)
+                yield delta
+        store_response(key, "".join(chunks).strip())
 
 class PatientOverviewService(OpenAIService):
+    # 같은 입력에도 매번 다른 랜덤 환자를 만들어야 하므로 캐시하지 않는다
+    cache_policy = NO_CACHE
+
     def generate_random_details(self, patient_details, summarized_info):
         disease_name = patient_details.get('질병명', '정보 없음')
         purpose = patient_details.get('목적', '정보 없음')
 
+        budget = PromptBudget()
         if summarized_info:
-            prompt_message = (
-                f"다음 요약 정보, 질병명, 목적을 바탕으로 환자 정보를 생성해주세요:\n"
-                f"요약 정보: {summarized_info}\n"
-                f"질병명: {disease_name}\n"
-                f"목적: {purpose}\n"
-            )
+            budget.add("instructions", "다음 요약 정보, 질병명, 목적을 바탕으로 환자 정보를 생성해주세요:\n요약 정보: ")
+            budget.add("background", summarized_info)
+            budget.add("instructions", "\n")
         else:
-            prompt_message = (
-                f"다음 질병명과 목적에 맞춰 환자 정보를 생성해주세요:\n"
-                f"질병명: {disease_name}\n"
-                f"목적: {purpose}\n"
-            )
+            budget.add("instructions", "다음 질병명과 목적에 맞춰 환자 정보를 생성해주세요:\n")
+        budget.add("instructions", f"질병명: {disease_name}\n목적: {purpose}\n")
 
+        patient_info = ""
         for key, value in patient_details.items():
             if value == "랜덤":
                 if key == '주호소' or key == '1차 진단명':
-                    prompt_message += f"{key}: {disease_name}과 관련된 내용으로 생성해주세요.\n"
+                    patient_info += f"{key}: {disease_name}과 관련된 내용으로 생성해주세요.\n"
                 elif key == '약물':
                     age = patient_details.get('나이', '정보 없음')
                     gender = patient_details.get('성별', '정보 없음')
-                    prompt_message += f"{key}: {age}세 {gender}에 적합한 일반적인 약물을 제안해주세요.\n"
+                    patient_info += f"{key}: {age}세 {gender}에 적합한 일반적인 약물을 제안해주세요.\n"
                 else:
-                    prompt_message += f"{key}: 랜덤 값 생성해주세요.\n"
+                    patient_info += f"{key}: 랜덤 값 생성해주세요.\n"
             else:
-                prompt_message += f"{key}: {value}\n"
+                patient_info += f"{key}: {value}\n"
+        budget.add("patient_info", patient_info)
 
         if patient_details.get('몸무게', '') == '랜덤 kg' and patient_details.get('키', '') == '랜덤 cm':
             age = patient_details.get('나이', '정보 없음')
             gender = patient_details.get('성별', '정보 없음')
-            prompt_message += f"\n나이: {age}세와 성별: {gender}에 적당한 몸무게와 키를 제안해주세요.\n"
-
-        # 토큰 길이 확인
-        max_tokens = 16000  # 16,385 토큰을 넘지 않도록 설정
-        token_count = num_tokens_from_string(prompt_message, "cl100k_base")
-        if token_count > max_tokens:
-            prompt_message = prompt_message[:max_tokens]  # 최대 토큰 수에 맞게 자르기
-
-        chat_completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a medical professional generating random patient details."},
-                {"role": "user", "content": prompt_message}
-            ]
-        )
-        response_content = chat_completion.choices[0].message.content.strip()
+            budget.add("instructions", f"\n나이: {age}세와 성별: {gender}에 적당한 몸무게와 키를 제안해주세요.\n")
+
+        response_content = self._chat_completion(self._budget_messages(
+            "You are a medical professional generating random patient details.", budget
+        ))
 
         # 결과를 파싱하여 랜덤 필드 업데이트
         for line in response_content.split('\n'):
@@ -79,137 +178,213 @@ class PatientOverviewService(OpenAIService):
 
 
 class PatientCreationService(OpenAIService):
+    cache_policy = CachePolicy(max_age=7 * DAY)
+
     def create_scenario(self, disease_name, purpose, patient_info_details, summarized_info):
-        prompt_message = (
-            f"{disease_name}에 대한 {purpose} 시뮬레이션 시나리오를 작성해주세요. "
-            f"환자 정보는 다음과 같습니다: {patient_info_details}. "
+        return self._chat_completion(self._scenario_messages(disease_name, purpose, patient_info_details, summarized_info))
+
+    def stream_scenario(self, disease_name, purpose, patient_info_details, summarized_info):
+        return self._chat_completion_stream(self._scenario_messages(disease_name, purpose, patient_info_details, summarized_info))
+
+    def _scenario_messages(self, disease_name, purpose, patient_info_details, summarized_info):
+        budget = PromptBudget()
+        budget.add("instructions", f"{disease_name}에 대한 {purpose} 시뮬레이션 시나리오를 작성해주세요. 환자 정보는 다음과 같습니다: ")
+        budget.add("patient_info", patient_info_details)
+        budget.add("instructions", (
+            ". "
             "문서의 구성은 환자 개요(Brief description of client), 자세한 상황 설명 순으로 작성해주세요. "
             "해당사항 없음을 입력으로 받으면 없음으로 작성해주세요. "
             "환자개요는 한글로 작성해주세요."
             "각 환자개요 사이에 적절한 줄바꿈을 포함하여 작성해주세요.\n"
             "\n\n"
-            "환자 개요(Brief description of client):\n"
-            "◦ 질병명(Disease Name):\n"
-            "◦ 목적(Purpose):\n"
-            "◦ 이름(Name):\n"
-            "◦ 성별(Gender):\n"
-            "◦ 나이(Age):\n"
-            "◦ 키(Height):\n"
-            "◦ 몸무게(Weight):\n"
-            "◦ 주호소(Chief complaint):\n"
-            "◦ 입원경로(History of present illness):\n"
-            "◦ 사회력(Social history):\n"
-            "◦ 과거질병력(Past medical history):\n"
-            "◦ 과거수술력(Past surgical history & date):\n"
-            "◦ 가족력(Family medical history):\n"
-            "◦ 약물(Medication):\n"
-            "◦ 1차 진단명(Primary diagnosis):\n"
+            f"{PATIENT_OVERVIEW_TEMPLATE}"
             "\n배경 지식:\n"
             "배경 지식은 한글로 작성해주세요."
-            f"{summarized_info}\n"            
-            "\n자세한 상황 설명을 작성해주세요.\n"
-        )
+        ))
+        budget.add("background", summarized_info)
+        budget.add("instructions", "\n\n자세한 상황 설명을 작성해주세요.\n")
 
-        # 토큰 길이 확인 및 자르기
-        max_tokens = 16000  # 16,385 토큰을 넘지 않도록 설정
-        token_count = num_tokens_from_string(prompt_message, "cl100k_base")
-        if token_count > max_tokens:
-            prompt_message = prompt_message[:max_tokens]  # 최대 토큰 수에 맞게 자르기
-
-        chat_completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a nursing department's professor, help the user to generate a patient information."},
-                {"role": "user", "content": prompt_message}
-            ]
+        return self._budget_messages(
+            "You are a nursing department's professor, help the user to generate a patient information.", budget
         )
-        return chat_completion.choices[0].message.content.strip()
 
 
 
 class NursingScenarioService(OpenAIService):
+    cache_policy = CachePolicy(max_age=7 * DAY)
+
     def create_nursing_scenario(self, patient_info_details, purpose, summarized_info):
-        prompt_message = (
-            f"다음 환자 정보에 대한 시뮬레이션 시나리오를 작성해주세요:\n"
-            f"{patient_info_details}\n"
+        return self._chat_completion(self._nursing_scenario_messages(patient_info_details, purpose, summarized_info))
+
+    def stream_nursing_scenario(self, patient_info_details, purpose, summarized_info):
+        return self._chat_completion_stream(self._nursing_scenario_messages(patient_info_details, purpose, summarized_info))
+
+    def _nursing_scenario_messages(self, patient_info_details, purpose, summarized_info):
+        budget = PromptBudget()
+        budget.add("instructions", "다음 환자 정보에 대한 시뮬레이션 시나리오를 작성해주세요:\n")
+        budget.add("patient_info", patient_info_details)
+        budget.add("instructions", (
+            "\n"
             f"목적: {purpose}\n"
             "각 단계는 환자의 상태, 예상 간호 중재, 브리핑을 위한 교육 포인트를 포함해야 합니다. "
             "각 항목과 단계 사이에 적절한 줄바꿈을 포함하여 작성해주세요.\n"
             "\n배경 지식:\n"
             "배경 지식은 한글로 작성해주세요."
-            f"{summarized_info}\n"
+        ))
+        budget.add("background", summarized_info)
+        budget.add("instructions", (
+            "\n"
             "\n시나리오 단계의 목차는 꼭 아래 목차를 사용해줘."
             "시나리오 단계(예시):\n"
-            "1. Initial Stage:\n"
-            "  - 환자 상태: [환자의 상태 설명]\n"
-            "  - 예상 간호 중재: [예상 간호 중재 설명]\n"
-            "  - 교육 포인트: [교육 포인트 설명]\n"
-            "2. 1st state/interval:\n"
-            "  - 환자 상태: [환자의 상태 설명]\n"
-            "  - 예상 간호 중재: [예상 간호 중재 설명]\n"
-            "  - 교육 포인트: [교육 포인트 설명]\n"
-            "3. 2nd state/interval:\n"
-            "  - 환자 상태: [환자의 상태 설명]\n"
-            "  - 예상 간호 중재: [예상 간호 중재 설명]\n"
-            "  - 교육 포인트: [교육 포인트 설명]\n"
-            "4. 3rd state/interval:\n"
-            "  - 환자 상태: [환자의 상태 설명]\n"
-            "  - 예상 간호 중재: [예상 간호 중재 설명]\n"
-            "  - 교육 포인트: [교육 포인트 설명]\n"
+            f"{SCENARIO_STAGES_TEMPLATE}"
+        ))
+
+        return self._budget_messages(
+            "You are a nursing department's professor. Help the user to generate a nusing scenerio.", budget
         )
 
-        chat_completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a nursing department's professor. Help the user to generate a nusing scenerio."},
-                {"role": "user", "content": prompt_message}
-            ]
+
+class CombinedScenarioService(OpenAIService):
+    """ 환자 정보의 랜덤 항목, 환자 개요, 간호 시나리오를 JSON 응답 하나로 생성한다. """
+    # 랜덤 항목을 채우므로 PatientOverviewService처럼 캐시하지 않는다
+    cache_policy = NO_CACHE
+    system_content = (
+        "You are a nursing department's professor. "
+        "Return one JSON object with patient_details, patient_overview and scenario for a nursing simulation."
+    )
+
+    def generate_all(self, patient_details, summarized_info):
+        """ (채워진 환자 정보, 환자 개요, 간호 시나리오) 반환. 응답이 올바른 JSON이 아니면 ValueError. """
+        response_content = self._chat_completion(
+            self._combined_messages(patient_details, summarized_info),
+            validate=parse_combined_response,
+            response_format={"type": "json_object"}
         )
+        result = parse_combined_response(response_content)
 
-        scenario = chat_completion.choices[0].message.content.strip()
-        return scenario
+        details = dict(patient_details)
+        generated_details = result.get("patient_details") or {}
+        for key, value in details.items():
+            if value == "랜덤" and key in generated_details:
+                details[key] = as_text(generated_details[key])  # 실제 값으로 대체
+        return details, as_text(result.get("patient_overview", "")), as_text(result.get("scenario", ""))
+
+    def _combined_messages(self, patient_details, summarized_info):
+        disease_name = patient_details.get('질병명', '정보 없음')
+        purpose = patient_details.get('목적', '정보 없음')
+
+        budget = PromptBudget()
+        budget.add("instructions", (
+            f"{disease_name}에 대한 {purpose} 간호 시뮬레이션 자료를 한 번에 작성해주세요. "
+            "값이 '랜덤'인 환자 정보 항목은 질병과 나이, 성별에 맞는 값으로 채우고, "
+            "해당사항 없음인 항목은 없음으로 작성해주세요.\n환자 정보:\n"
+        ))
+        budget.add("patient_info", json.dumps(patient_details, ensure_ascii=False))
+        budget.add("instructions", "\n\n배경 지식 (한글로 반영해주세요):\n")
+        budget.add("background", summarized_info or "없음")
+        budget.add("instructions", (
+            "\n\n다음 키를 가진 JSON 객체 하나로만 응답해주세요.\n"
+            "- patient_details: 입력과 같은 키를 가진 객체 (모든 값은 문자열)\n"
+            "- patient_overview: 아래 목차를 따른 환자 개요와 자세한 상황 설명 (한글, 항목마다 줄바꿈)\n"
+            f"{PATIENT_OVERVIEW_TEMPLATE}"
+            "- scenario: 아래 목차를 꼭 사용한 시나리오 단계. 각 단계는 환자 상태, 예상 간호 중재, 교육 포인트를 포함하고 단계 사이에 빈 줄을 넣어주세요.\n"
+            f"{SCENARIO_STAGES_TEMPLATE}"
+        ))
+        return self._budget_messages(self.system_content, budget)
+
+
+def parse_combined_response(response_content):
+    """ JSON 모드 응답을 dict로 파싱한다. 올바른 JSON 객체가 아니면 ValueError. """
+    try:
+        result = json.loads(response_content)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON response: {e}") from e
+    if not isinstance(result, dict):
+        raise ValueError("Invalid JSON response: expected an object")
+    return result
+
+
+def as_text(value):
+    # JSON 응답에서 문자열 대신 목록이나 객체가 오는 경우도 화면에 쓸 수 있는 문자열로 바꾼다
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return "\n".join(as_text(item) for item in value)
+    if isinstance(value, dict):
+        return "\n".join(f"{key}: {as_text(item)}" for key, item in value.items())
+    return "" if value is None else str(value)
+
+
+# 단계별 수정 때 맥락으로 보내는 환자 개요의 최대 토큰 수
+STAGE_CONTEXT_TOKENS = 200
 
 
 class ScenarioRevisionService(OpenAIService):
-    def revise_scenario_with_feedback(self, edited_scenario, feedback):
-        prompt_message = (
-            f"다음은 수정된 간호 시나리오입니다. 이 시나리오와 사용자 피드백을 바탕으로 환자 시나리오를 다시 작성해주세요:\n"
-            f"수정된 시나리오:\n{edited_scenario}\n"
-            f"피드백:\n{feedback}\n"
-        )
+    # "다시 작성해줘" 같은 피드백은 매번 새 응답을 기대하므로 캐시하지 않는다
+    cache_policy = NO_CACHE
 
-        chat_completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a nursing department's professor. Help the user to revise a nursing scenario based on provided details and feedback."},
-                {"role": "user", "content": prompt_message}
-            ]
-        )
+    def revise_scenario_with_feedback(self, edited_scenario, feedback):
+        budget = PromptBudget()
+        budget.add("instructions", "다음은 수정된 간호 시나리오입니다. 이 시나리오와 사용자 피드백을 바탕으로 환자 시나리오를 다시 작성해주세요:\n수정된 시나리오:\n")
+        budget.add("scenario", edited_scenario)
+        budget.add("instructions", f"\n피드백:\n{feedback}\n")
 
-        revised_scenario = chat_completion.choices[0].message.content.strip()
+        revised_scenario = self._chat_completion(self._budget_messages(
+            "You are a nursing department's professor. Help the user to revise a nursing scenario based on provided details and feedback.", budget
+        ))
         return revised_scenario
 
+    def revise_stages(self, scenario, feedback, patient_overview=""):
+        """ 피드백이 가리키는 단계만 보내 수정하고 원래 자리에 끼워 넣는다.
+
+        (수정된 시나리오, 수정한 단계 이름 목록) 반환. 단계를 특정할 수 없으면 전체를 다시 쓰고 목록은 None.
+        """
+        parsed = parse_scenario(scenario)
+        targets = detect_target_stages(feedback, parsed)
+        if not targets:
+            return self.revise_scenario_with_feedback(scenario, feedback), None
+
+        budget = PromptBudget()
+        budget.add("instructions", (
+            "다음 간호 시나리오에서 [수정할 단계]만 피드백에 맞게 다시 작성해주세요. "
+            "각 단계의 제목 줄은 그대로 두고, 수정한 단계만 같은 형식으로 출력해주세요.\n\n[환자 개요]\n"
+        ))
+        budget.add("background", patient_overview or "없음", max_tokens=STAGE_CONTEXT_TOKENS)
+        budget.add("instructions", "\n\n[다른 단계 요약]\n")
+        budget.add("background", stage_outline(parsed, exclude=targets) or "없음")
+        budget.add("instructions", "\n\n[수정할 단계]\n")
+        budget.add("scenario", "".join(parsed.stages[i].text for i in targets))
+        budget.add("instructions", f"\n피드백:\n{feedback}\n")
+
+        response_content = self._chat_completion(self._budget_messages(
+            "You are a nursing department's professor. Revise only the requested stages of a nursing scenario based on the feedback.", budget
+        ))
+
+        revised = parse_scenario(response_content)
+        replacements = {}
+        for stage in revised.stages:
+            for i in targets:
+                if parsed.stages[i].name == stage.name:
+                    replacements[i] = stage.text
+        if not replacements and len(targets) == 1:
+            # 제목 줄 없이 본문만 돌려준 경우
+            replacements[targets[0]] = response_content
+        if not replacements:
+            return self.revise_scenario_with_feedback(scenario, feedback), None
+        return replace_stages(parsed, replacements), [parsed.stages[i].name for i in sorted(replacements)]
+
+
 class SummaryService(OpenAIService):
+    cache_policy = CachePolicy(max_age=30 * DAY)
+
     def summarize_info(self, info, max_length=500):
-        # 정보의 길이가 너무 길면 자르기
-        max_tokens = 16000  # 16,385 토큰을 넘지 않도록 설정
-        encoding_name = "cl100k_base"
-        token_count = num_tokens_from_string(info, encoding_name)
-        
-        if token_count > max_tokens:
-            info = info[:max_tokens]  # 최대 토큰 수에 맞게 자르기
-
-        prompt_message = (
-            f"다음 정보를 해당 질병정보의 원인, 증상, 예방, 치료방법 대해서 자세하게 요약해 주세요. 요약은 최대 {max_length}자로 제한됩니다:\n"
-            f"{info}\n"
-        )
-        
-        chat_completion = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a professional nursing text summarizer."},
-                {"role": "user", "content": prompt_message}
-            ]
-        )
-        return chat_completion.choices[0].message.content.strip()
+        # 정보가 너무 길면 예산에 맞게 정보 부분만 토큰 단위로 자른다
+        budget = PromptBudget()
+        budget.add("instructions", f"다음 정보를 해당 질병정보의 원인, 증상, 예방, 치료방법 대해서 자세하게 요약해 주세요. 요약은 최대 {max_length}자로 제한됩니다:\n")
+        budget.add("background", info)
+        budget.add("instructions", "\n")
+
+        return self._chat_completion(self._budget_messages(
+            "You are a professional nursing text summarizer.", budget
+        ))
 
@@ -0,0 +1,69 @@
+import numpy as np
+
+
+def top_k_positions(scores, k):
+    # 전체 정렬 없이 상위 k개를 고른 뒤 그 k개만 정렬한다
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class IVFIndex:
+    """ 단위 벡터 행렬에 대한 IVF(inverted file) 근사 최근접 이웃 인덱스.
+
+    구면 k-means로 만든 n_lists개의 중심 중 질의와 가까운 n_probe개 리스트만 정확히 계산한다.
+    n_probe를 늘리면 recall이 오르고 속도는 느려진다 (n_probe == n_lists이면 정확 검색과 같다).
+    """
+
+    def __init__(self, matrix, n_lists=None, n_probe=8, n_iter=10, train_size=None, seed=0, chunk_size=65536):
+        self.matrix = matrix
+        self.n_probe = n_probe
+        n = len(matrix)
+        self.n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+
+        # 학습은 표본으로만 한다
+        train_size = min(n, train_size or self.n_lists * 64)
+        sample = matrix[rng.choice(n, train_size, replace=False)]
+        self.centroids = self._train(sample, n_iter, rng)
+
+        # 모든 벡터를 가장 가까운 중심에 배정하고, 리스트별로 모인 위치 배열을 만든다
+        assignments = np.empty(n, dtype=np.int64)
+        for start in range(0, n, chunk_size):
+            block = matrix[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(block @ self.centroids.T, axis=1)
+        self.members = np.argsort(assignments, kind='stable')
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=self.n_lists))))
+
+    def _train(self, sample, n_iter, rng):
+        centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=self.n_lists)
+            # 빈 리스트는 임의의 표본으로 다시 채운다
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(sample.dtype, copy=False)
+        return centroids
+
+    def candidates(self, query, n_probe=None):
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        lists = top_k_positions(self.centroids @ query, n_probe)
+        return np.concatenate([self.members[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+
+    def search(self, query, k=None, threshold=None, n_probe=None):
+        """ 후보 리스트 안에서 (위치, 코사인 유사도)를 유사도 내림차순으로 반환한다. """
+        positions = self.candidates(query, n_probe)
+        scores = self.matrix[positions] @ query
+        if threshold is not None:
+            keep = scores >= threshold
+            positions, scores = positions[keep], scores[keep]
+        order = top_k_positions(scores, len(scores) if k is None else k)
+        return positions[order], scores[order]
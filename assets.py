@@ -0,0 +1,105 @@
+import base64
+import io
+import os
+import threading
+import time
+from PIL import Image
+
+# 파일이 바뀌었는지 이 간격(초)마다 한 번만 stat으로 확인한다. 그 사이의 rerun은 디스크를 읽지 않는다
+ASSET_CHECK_INTERVAL = float(os.getenv("ASSET_CHECK_INTERVAL", "5"))
+# 화면에 표시되는 폭(px). 고해상도 화면을 위해 ASSET_PIXEL_RATIO배로 만든다
+LOGO_WIDTH = 250
+HERO_WIDTH = int(os.getenv("HERO_IMAGE_WIDTH", "1000"))
+ASSET_PIXEL_RATIO = float(os.getenv("ASSET_PIXEL_RATIO", "1.5"))
+HERO_QUALITY = int(os.getenv("HERO_IMAGE_QUALITY", "80"))
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'webp')
+
+MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# key: (mtime, 마지막 확인 시각, 값)
+_entries = {}
+_lock = threading.Lock()
+
+
+def _cached(key, path, loader):
+    """ path의 mtime이 그대로면 이전에 만든 값을 돌려준다. 파일이 없으면 None. """
+    now = time.monotonic()
+    entry = _entries.get(key)
+    if entry is not None and now - entry[1] < ASSET_CHECK_INTERVAL:
+        return entry[2]
+
+    with _lock:
+        entry = _entries.get(key)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            _entries.pop(key, None)
+            return None
+        if entry is not None and entry[0] == mtime:
+            _entries[key] = (mtime, now, entry[2])
+            return entry[2]
+        value = loader()
+        _entries[key] = (mtime, now, value)
+        return value
+
+
+def clear_assets():
+    with _lock:
+        _entries.clear()
+
+
+def get_css(path="style.css"):
+    def load():
+        with open(path, "r", encoding="utf-8") as f:
+            return f"<style>{f.read()}</style>"
+    return _cached(("css", path), path, load)
+
+
+def file_base64(path):
+    """ 파일 내용을 그대로 base64로 인코딩한 문자열. """
+    def load():
+        with open(path, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+    return _cached(("file", path), path, load)
+
+
+def list_images(folder_path):
+    # 디렉터리의 mtime은 파일을 추가/삭제할 때 바뀐다
+    def load():
+        return sorted(
+            os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+    return _cached(("dir", folder_path), folder_path, load) or []
+
+
+def encode_thumbnail(path, width, image_format=None, quality=HERO_QUALITY):
+    """ 폭이 width를 넘으면 비율을 유지해서 줄이고 data URI로 인코딩한다. """
+    with Image.open(path) as image:
+        image_format = image_format or ("PNG" if image.mode in ("RGBA", "LA", "P") else "WEBP")
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        if image_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        if image_format == "PNG":
+            image.save(buffer, format="PNG", optimize=True)
+        else:
+            image.save(buffer, format=image_format, quality=quality)
+    return f"data:{MIME_TYPES[image_format]};base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+
+def image_data_uri(path, width, image_format=None):
+    """ 화면 폭 width(px)에 맞게 줄인 이미지의 data URI. 파일이 바뀔 때만 다시 만든다. """
+    pixel_width = round(width * ASSET_PIXEL_RATIO)
+    return _cached(
+        ("image", path, pixel_width, image_format), path,
+        lambda: encode_thumbnail(path, pixel_width, image_format)
+    )
+
+
+def sidebar_logo_uri(path="./image/sidebar_logo.png"):
+    return image_data_uri(path, LOGO_WIDTH)
+
+
+def hero_image_uri(path):
+    return image_data_uri(path, HERO_WIDTH)
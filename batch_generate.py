@@ -0,0 +1,292 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import mysql.connector
+from GPT_api import PatientOverviewService, PatientCreationService, NursingScenarioService
+from db import fetch_all
+from embedding import encode_queries
+from ranking import rank_diseases
+from summaries import summarize_selected_info
+from utils import format_patient_info, save_scenarios_to_mariadb
+from vector_index import get_vector_index
+import translation
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_INSERT_SIZE = 20
+BACKGROUND_LIMIT = 3
+# 저장하는 순간 다른 곳에서 같은 id를 쓴 경우 id를 다시 정해 INSERT를 반복하는 횟수
+ID_ASSIGN_RETRIES = 3
+ID_TIME_FORMAT = '%Y%m%d%H%M%S'
+
+# 템플릿을 주지 않으면 마법사에서 모든 항목을 선택하고 비워둔 것과 같은 환자 정보를 사용한다
+DEFAULT_TEMPLATE = {
+    field: "랜덤" for field in [
+        '이름', '나이', '성별', '몸무게', '키', '주호소', '입원경로', '사회력',
+        '과거병력', '과거수술력', '가족력', '약물', '1차 진단명', '추가사항'
+    ]
+}
+
+
+def item_key(disease_name, purpose, template):
+    # 체크포인트에서 같은 작업을 알아보기 위한 키 (템플릿 내용까지 포함)
+    payload = json.dumps([disease_name, purpose, template], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def plan_items(diseases, purposes, templates):
+    """ 질병 x 목적 x 템플릿 격자의 작업 목록. 시나리오 id는 저장할 때 정한다 (assign_ids). """
+    items = []
+    for disease_name in diseases:
+        for purpose in purposes:
+            for template in templates:
+                items.append({
+                    "key": item_key(disease_name, purpose, template),
+                    "disease_name": disease_name,
+                    "purpose": purpose,
+                    "template": template
+                })
+    return items
+
+
+def find_background_info(disease_name, limit=BACKGROUND_LIMIT):
+    """ 마법사 1페이지와 같은 검색으로 관련 Disease_info 행을 고른다. """
+    if translation.contains_hangul(disease_name):
+        query_text = translation.translate_to_english(disease_name)
+    else:
+        query_text = disease_name
+    query_texts = [query_text, query_text.rstrip('s')]
+
+    index = get_vector_index()
+    sorted_results, filtered_sorted_results = rank_diseases(index, encode_queries(query_texts), query_texts)
+    return [index.row(ranked.id) for ranked in (sorted_results + filtered_sorted_results)[:limit]]
+
+
+def generate_scenario(item, background_limit=BACKGROUND_LIMIT):
+    """ 요약 -> 환자 정보 -> 환자 개요 -> 간호 시나리오를 차례로 생성한다. """
+    disease_name = item["disease_name"]
+    purpose = item["purpose"]
+
+    summarized_info = summarize_selected_info(find_background_info(disease_name, background_limit))
+
+    patient_details = dict(item["template"])
+    patient_details['질병명'] = disease_name
+    patient_details['목적'] = purpose
+    patient_details = PatientOverviewService().generate_random_details(patient_details, summarized_info)
+
+    formatted_patient_info = format_patient_info(patient_details)
+    patient_overview = PatientCreationService().create_scenario(disease_name, purpose, formatted_patient_info, summarized_info)
+    scenario = NursingScenarioService().create_nursing_scenario(formatted_patient_info, purpose, summarized_info)
+    return patient_details, patient_overview, scenario
+
+
+class Checkpoint:
+    """ 작업 진행 상황을 JSONL 파일에 남긴다.
+
+    생성이 끝난 항목은 결과와 함께 "generated"로, DB에 저장된 항목은 "saved"로 기록하므로
+    중단 후 다시 실행하면 저장된 항목은 건너뛰고 생성만 끝난 항목은 API 호출 없이 저장한다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.generated = {}
+        self.saved = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record["status"] == "saved":
+                        self.saved.add(record["key"])
+                    else:
+                        self.generated[record["key"]] = record
+        for key in self.saved:
+            self.generated.pop(key, None)
+
+    def _append(self, records):
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def mark_generated(self, record):
+        self._append([dict(record, status="generated")])
+        self.generated[record["key"]] = record
+
+    def mark_saved(self, records):
+        self._append([{"key": record["key"], "id": record["id"], "status": "saved"} for record in records])
+        for record in records:
+            self.saved.add(record["key"])
+            self.generated.pop(record["key"], None)
+
+
+def existing_scenarios(document_ids):
+    # id -> 저장된 시나리오 본문
+    if not document_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(document_ids))
+    rows = fetch_all(f"SELECT id, scenario FROM scenarios WHERE id IN ({placeholders})", list(document_ids), dictionary=False)
+    return {document_id: scenario for document_id, scenario in rows}
+
+
+def id_prefix(record):
+    # UI(save_scenario_to_mariadb)와 같은 "질병명_목적_" 형식
+    patient_info = record["patient_info"]
+    disease_name = record.get("disease_name") or patient_info.get('질병명', 'unknown')
+    purpose = record.get("purpose") or patient_info.get('목적', 'unknown')
+    return f"{disease_name.replace(' ', '')}_{purpose.replace(' ', '')}_"
+
+
+def assign_ids(checkpoint, records):
+    """ id가 없는 기록에 "질병명_목적_시각" id를 정한다.
+
+    지금 시각부터 1초씩 거슬러 올라가며 DB와 이번 배치에서 쓰이지 않은 시각을 고르고, created_at도 그 시각으로 저장한다.
+    정한 id는 체크포인트에 먼저 남겨서 INSERT 후 중단되어도 다시 실행할 때 알아볼 수 있게 한다.
+    """
+    records = [record for record in records if not record.get("id")]
+    if not records:
+        return
+    now = datetime.now().replace(microsecond=0)
+    used = set()
+    # prefix -> DB에서 쓰인 id를 확인한 가장 이른 시각. 그보다 더 거슬러 올라가면 다음 구간을 조회한다
+    checked = {}
+    for record in records:
+        prefix = id_prefix(record)
+        created = now
+        while True:
+            if created < checked.get(prefix, created + timedelta(seconds=1)):
+                oldest = created - timedelta(seconds=len(records))
+                rows = fetch_all(
+                    "SELECT id FROM scenarios WHERE id BETWEEN %s AND %s",
+                    (prefix + oldest.strftime(ID_TIME_FORMAT), prefix + created.strftime(ID_TIME_FORMAT)),
+                    dictionary=False
+                )
+                used.update(row[0] for row in rows)
+                checked[prefix] = oldest
+            if prefix + created.strftime(ID_TIME_FORMAT) not in used:
+                break
+            created -= timedelta(seconds=1)
+        record["id"] = prefix + created.strftime(ID_TIME_FORMAT)
+        record["created_at"] = created.strftime('%Y-%m-%d %H:%M:%S')
+        used.add(record["id"])
+        checkpoint.mark_generated(record)
+
+
+def flush(checkpoint, pending):
+    """ 생성된 기록을 저장하고 체크포인트에 남긴다. DB 에러가 나면 pending을 그대로 두고 에러를 낸다. """
+    if not pending:
+        return
+    # 이전 실행에서 INSERT 후 체크포인트 기록 전에 중단된 행은 다시 넣지 않는다. 같은 id라도 본문이 다르면 다른 곳에서 저장한 행이다
+    existing = existing_scenarios([record["id"] for record in pending if record.get("id")])
+    to_insert = []
+    for record in pending:
+        if record.get("id") in existing and existing[record["id"]] != record["scenario"]:
+            record["id"] = None
+        if record.get("id") not in existing:
+            to_insert.append(record)
+
+    for attempt in range(ID_ASSIGN_RETRIES):
+        assign_ids(checkpoint, to_insert)
+        try:
+            save_scenarios_to_mariadb([
+                (record["id"], record["patient_info"], record["patient_overview"], record["scenario"], record.get("created_at"))
+                for record in to_insert
+            ])
+            break
+        except mysql.connector.IntegrityError:
+            # id를 고른 뒤 INSERT 전에 다른 곳에서 같은 id를 저장했다. 전체가 롤백되었으므로 id를 모두 다시 정한다
+            if attempt == ID_ASSIGN_RETRIES - 1:
+                raise
+            for record in to_insert:
+                record["id"] = None
+    checkpoint.mark_saved(pending)
+    pending.clear()
+
+
+def run_batch(items, checkpoint_path, workers=BATCH_WORKERS, insert_size=BATCH_INSERT_SIZE, background_limit=BACKGROUND_LIMIT):
+    checkpoint = Checkpoint(checkpoint_path)
+    pending = list(checkpoint.generated.values())
+    todo = [item for item in items if item["key"] not in checkpoint.saved and item["key"] not in checkpoint.generated]
+    print(f"전체 {len(items)}개 중 저장 완료 {len(checkpoint.saved)}개, 저장 대기 {len(pending)}개, 생성 {len(todo)}개")
+
+    failures = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(generate_scenario, item, background_limit): item for item in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            item = futures[future]
+            try:
+                patient_info, patient_overview, scenario = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{len(todo)}] 실패 {item['disease_name']} / {item['purpose']}: {e}")
+                continue
+
+            record = {
+                "key": item["key"],
+                "disease_name": item["disease_name"],
+                "purpose": item["purpose"],
+                "patient_info": patient_info,
+                "patient_overview": patient_overview,
+                "scenario": scenario
+            }
+            checkpoint.mark_generated(record)
+            pending.append(record)
+            print(f"[{done}/{len(todo)}] 생성 {item['disease_name']} / {item['purpose']} ({time.perf_counter() - started:.1f}s)")
+            if len(pending) >= insert_size:
+                try_flush(checkpoint, pending)
+    try_flush(checkpoint, pending)
+
+    # 저장하지 못한 기록은 체크포인트에 "generated"로 남아 있어 다시 실행하면 API 호출 없이 저장된다
+    failures += len(pending)
+    print(f"완료: 저장 {len(checkpoint.saved)}개, 실패 {failures}개, {time.perf_counter() - started:.1f}s")
+    return failures
+
+
+def try_flush(checkpoint, pending):
+    try:
+        flush(checkpoint, pending)
+    except mysql.connector.Error as e:
+        print(f"저장 실패 ({len(pending)}개는 다음 저장 때 다시 시도): {e}")
+
+
+def load_list(value):
+    # 쉼표로 구분한 목록 또는 한 줄에 하나씩 적은 파일(@경로)
+    if value.startswith("@"):
+        with open(value[1:], "r", encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def load_templates(path):
+    if not path:
+        return [DEFAULT_TEMPLATE]
+    with open(path, "r", encoding="utf-8") as f:
+        templates = json.load(f)
+    return templates if isinstance(templates, list) else [templates]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="질병 x 목적 x 환자 템플릿 격자로 시나리오를 일괄 생성")
+    parser.add_argument("--diseases", required=True, help="쉼표로 구분한 질병명 또는 @파일")
+    parser.add_argument("--purposes", required=True, help="쉼표로 구분한 목적 또는 @파일")
+    parser.add_argument("--templates", help="환자 정보 템플릿 JSON 파일 (객체 또는 객체 목록)")
+    parser.add_argument("--checkpoint", default="batch_checkpoint.jsonl")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--insert-size", type=int, default=BATCH_INSERT_SIZE)
+    parser.add_argument("--background-limit", type=int, default=BACKGROUND_LIMIT)
+    args = parser.parse_args()
+
+    items = plan_items(load_list(args.diseases), load_list(args.purposes), load_templates(args.templates))
+    failures = run_batch(items, args.checkpoint, args.workers, args.insert_size, args.background_limit)
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import time
+import numpy as np
+from ann_index import IVFIndex, top_k_positions
+from vector_index import normalize_rows
+
+
+def make_corpus(size, dim, n_clusters, rng, chunk_size=100000):
+    # 실제 임베딩처럼 군집을 이루는 합성 벡터 (float32, 단위 벡터)
+    centers = normalize_rows(rng.standard_normal((n_clusters, dim)).astype(np.float32))
+    corpus = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, chunk_size):
+        end = min(size, start + chunk_size)
+        labels = rng.integers(0, n_clusters, end - start)
+        noise = rng.standard_normal((end - start, dim)).astype(np.float32) * 0.08
+        corpus[start:end] = normalize_rows(centers[labels] + noise)
+    return corpus
+
+
+def make_queries(corpus, n_queries, rng):
+    picks = corpus[rng.choice(len(corpus), n_queries, replace=False)]
+    noise = rng.standard_normal(picks.shape).astype(np.float32) * 0.02
+    return normalize_rows(picks + noise)
+
+
+def run(size, dim, k, n_queries, n_probes, seed):
+    rng = np.random.default_rng(seed)
+    corpus = make_corpus(size, dim, max(16, size // 500), rng)
+    queries = make_queries(corpus, n_queries, rng)
+
+    # 정확 검색 (기준값)
+    exact = []
+    started = time.perf_counter()
+    for query in queries:
+        exact.append(top_k_positions(corpus @ query, k))
+    exact_ms = (time.perf_counter() - started) * 1000 / n_queries
+    print(f"\n[{size:,}개, {dim}차원] exact: {exact_ms:.3f} ms/query")
+
+    started = time.perf_counter()
+    index = IVFIndex(corpus, seed=seed)
+    build_s = time.perf_counter() - started
+    print(f"IVF 빌드: {build_s:.2f} s (n_lists={index.n_lists})")
+
+    print(f"{'n_probe':>8} {'recall@' + str(k):>10} {'ms/query':>10} {'speedup':>8}")
+    for n_probe in n_probes:
+        hits = 0
+        started = time.perf_counter()
+        found = [index.search(query, k=k, n_probe=n_probe)[0] for query in queries]
+        ann_ms = (time.perf_counter() - started) * 1000 / n_queries
+        for approx, truth in zip(found, exact):
+            hits += len(np.intersect1d(approx, truth))
+        recall = hits / (k * n_queries)
+        print(f"{n_probe:>8} {recall:>10.4f} {ann_ms:>10.3f} {exact_ms / ann_ms:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF 근사 검색과 정확 검색의 recall@k / 지연시간 비교")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="코퍼스 크기 (쉼표 구분)")
+    parser.add_argument("--dim", type=int, default=384, help="paraphrase-MiniLM-L6-v2 임베딩 차원")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-probes", default="1,4,8,16,32")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    n_probes = [int(n) for n in args.n_probes.split(",")]
+    for size in (int(s) for s in args.sizes.split(",")):
+        run(size, args.dim, args.k, args.queries, n_probes, args.seed)
+
+
+if __name__ == "__main__":
+    main()
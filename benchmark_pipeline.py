@@ -0,0 +1,109 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from GPT_api import SummaryService, PatientOverviewService, PatientCreationService, NursingScenarioService, CombinedScenarioService
+from batch_generate import DEFAULT_TEMPLATE
+from llm_backend import LLM_BACKEND, MOCK_LLM_HOST, create_client, set_client
+from rate_limiter import rate_limiter_stats
+from utils import format_patient_info
+
+STAGES = ["summary", "details", "overview", "nursing"]
+COMBINED_STAGES = ["summary", "combined"]
+SAMPLE_DISEASES = ["폐렴", "심근경색", "당뇨병", "뇌졸중", "급성 신부전"]
+SAMPLE_INFO = (
+    '{"title": "Pneumonia", "paragraphs": ["Pneumonia is an infection that inflames the air sacs in one or both lungs. '
+    'The air sacs may fill with fluid or pus, causing cough with phlegm, fever, chills, and difficulty breathing."], '
+    '"info": {"Symptoms": "Chest pain, cough, fatigue, fever", "Treatment": "Antibiotics, cough medicine, fever reducers"}}'
+)
+
+
+def consume(chunks):
+    return "".join(chunks)
+
+
+def run_pipeline(disease_name, purpose, stream, combined=False):
+    """ 마법사와 같은 순서로 서비스를 호출하고 단계별 소요 시간(초)과 프롬프트 토큰 수를 반환한다. """
+    timings = {}
+    prompt_tokens = 0
+
+    def timed(stage, service, call):
+        nonlocal prompt_tokens
+        started = time.perf_counter()
+        result = call()
+        timings[stage] = time.perf_counter() - started
+        prompt_tokens += (service.last_token_counts or {}).get("total", 0)
+        return result
+
+    summary_service = SummaryService()
+    summarized_info = timed("summary", summary_service, lambda: summary_service.summarize_info(SAMPLE_INFO))
+
+    patient_details = dict(DEFAULT_TEMPLATE, 질병명=disease_name, 목적=purpose)
+    if combined:
+        combined_service = CombinedScenarioService()
+        timed("combined", combined_service, lambda: combined_service.generate_all(patient_details, summarized_info))
+        timings["total"] = sum(timings.values())
+        return timings, prompt_tokens
+
+    overview_service = PatientOverviewService()
+    patient_details = timed("details", overview_service, lambda: overview_service.generate_random_details(patient_details, summarized_info))
+    formatted_patient_info = format_patient_info(patient_details)
+
+    creation_service = PatientCreationService()
+    nursing_service = NursingScenarioService()
+    if stream:
+        timed("overview", creation_service, lambda: consume(creation_service.stream_scenario(disease_name, purpose, formatted_patient_info, summarized_info)))
+        timed("nursing", nursing_service, lambda: consume(nursing_service.stream_nursing_scenario(formatted_patient_info, purpose, summarized_info)))
+    else:
+        timed("overview", creation_service, lambda: creation_service.create_scenario(disease_name, purpose, formatted_patient_info, summarized_info))
+        timed("nursing", nursing_service, lambda: nursing_service.create_nursing_scenario(formatted_patient_info, purpose, summarized_info))
+
+    timings["total"] = sum(timings.values())
+    return timings, prompt_tokens
+
+
+def report(results, elapsed, stages=STAGES):
+    print(f"{'stage':>10} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for stage in stages + ["total"]:
+        values = np.array([timings[stage] for timings, _ in results]) * 1000
+        print(f"{stage:>10} {np.percentile(values, 50):10.1f} {np.percentile(values, 95):10.1f} {values.max():10.1f}")
+    prompt_tokens = [tokens for _, tokens in results]
+    print(f"시나리오 {len(results)}개, {elapsed:.1f}s, {len(results) / elapsed * 60:.1f}개/분")
+    print(f"시나리오당 프롬프트 토큰 평균 {np.mean(prompt_tokens):.0f}")
+    print(f"rate limiter: {rate_limiter_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="시나리오 생성 파이프라인 처리량/지연 벤치마크")
+    parser.add_argument("--scenarios", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--purpose", default="교육")
+    parser.add_argument("--stream", action="store_true", help="환자 개요와 간호 시나리오를 스트리밍으로 받는다")
+    parser.add_argument("--combined", action="store_true", help="환자 정보/개요/시나리오를 JSON 요청 하나로 생성")
+    parser.add_argument("--mock", action="store_true", help="같은 프로세스에 모의 LLM 서버를 띄워서 사용")
+    parser.add_argument("--mock-port", type=int, default=0, help="0이면 빈 포트를 사용")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.mock:
+        # 모의 서버는 이 스크립트에서만 필요하므로 여기서 import한다
+        from mock_llm_server import MockLLMConfig, start_mock_server
+        server = start_mock_server(MOCK_LLM_HOST, args.mock_port, MockLLMConfig(
+            latency=args.latency, tokens_per_second=args.tokens_per_second, error_rate=args.error_rate
+        ))
+        set_client(create_client("mock", f"http://{MOCK_LLM_HOST}:{server.server_address[1]}/v1"))
+        print(f"mock backend on port {server.server_address[1]}")
+    else:
+        print(f"backend: {LLM_BACKEND}")
+
+    diseases = [SAMPLE_DISEASES[i % len(SAMPLE_DISEASES)] for i in range(args.scenarios)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda disease_name: run_pipeline(disease_name, args.purpose, args.stream, args.combined), diseases))
+    report(results, time.perf_counter() - started, COMBINED_STAGES if args.combined else STAGES)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from mysql.connector import pooling
+from mysql.connector.errors import Error, PoolError
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "user": os.getenv("DB_USER", "scenario"),
+    "password": os.getenv("DB_PASSWORD", "Skaqn3301"),
+    "database": os.getenv("DB_NAME", "nursing_scenarios"),
+}
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+# 풀이 모두 사용 중일 때 빈 연결을 기다리는 최대 시간(초)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+
+class ConnectionPool:
+    """ 크기가 제한된 MariaDB 연결 풀. 빌려줄 때마다 ping으로 연결 상태를 확인한다. """
+
+    def __init__(self, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, **config):
+        # mysql-connector의 풀 크기 상한을 넘으면 생성자가 알아보기 힘든 에러를 내므로 먼저 확인한다
+        if not 1 <= size <= pooling.CNX_POOL_MAXSIZE:
+            raise ValueError(f"DB_POOL_SIZE는 1~{pooling.CNX_POOL_MAXSIZE} 사이여야 합니다 (현재 {size}).")
+        self.size = size
+        self.timeout = timeout
+        self.pool = pooling.MySQLConnectionPool(pool_name="nursing_scenarios", pool_size=size, **config)
+        # MySQLConnectionPool은 비어 있으면 바로 에러를 내므로, 세마포어로 빈 자리를 기다린다
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.stats = {"checkouts": 0, "in_use": 0, "reconnects": 0, "timeouts": 0, "wait_total_ms": 0.0, "wait_max_ms": 0.0}
+
+    @contextmanager
+    def connection(self):
+        started = time.perf_counter()
+        if not self.slots.acquire(timeout=self.timeout):
+            with self.lock:
+                self.stats["timeouts"] += 1
+            raise PoolError(f"No database connection available within {self.timeout}s")
+        waited_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            connection = self.pool.get_connection()
+            try:
+                # 끊어진 연결이면 다시 연결한다
+                if not connection.is_connected():
+                    connection.reconnect(attempts=2, delay=0)
+                    with self.lock:
+                        self.stats["reconnects"] += 1
+                with self.lock:
+                    self.stats["checkouts"] += 1
+                    self.stats["in_use"] += 1
+                    self.stats["wait_total_ms"] += waited_ms
+                    self.stats["wait_max_ms"] = max(self.stats["wait_max_ms"], waited_ms)
+                try:
+                    yield connection
+                except Exception:
+                    # 연결이 끊겨 롤백이 실패해도 원래 에러를 그대로 올린다
+                    try:
+                        connection.rollback()
+                    except Error:
+                        pass
+                    raise
+                finally:
+                    with self.lock:
+                        self.stats["in_use"] -= 1
+            finally:
+                # 재연결이 실패해도 풀로 반납해야 자리를 잃지 않는다
+                connection.close()
+        finally:
+            self.slots.release()
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats, size=self.size)
+        stats["wait_avg_ms"] = stats["wait_total_ms"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    # 프로세스당 하나의 풀을 처음 사용할 때 만든다
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(**DB_CONFIG)
+    return _pool
+
+
+def connection():
+    """ with connection() as conn: 형태로 풀에서 연결을 빌리고 블록이 끝나면 반납한다. """
+    return get_pool().connection()
+
+
+def pool_stats():
+    return get_pool().get_stats()
+
+
+def fetch_all(query, params=(), dictionary=True):
+    with connection() as conn:
+        cursor = conn.cursor(dictionary=dictionary)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+def fetch_one(query, params=(), dictionary=True):
+    with connection() as conn:
+        cursor = conn.cursor(dictionary=dictionary)
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+        cursor.fetchall()
+        cursor.close()
+    return row
+
+
+def execute(query, params=()):
+    """ 쓰기 쿼리 하나를 실행하고 커밋한 뒤 영향받은 행 수를 반환한다. """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        conn.commit()
+        rowcount = cursor.rowcount
+        cursor.close()
+    return rowcount
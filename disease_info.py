@@ -1,38 +1,60 @@
 import streamlit as st
-import mysql.connector
 import json
-from sklearn.metrics.pairwise import cosine_similarity
+import os
+import random
 import numpy as np
-import requests
+from translation import translate_to_english, contains_hangul
+from db import fetch_all, fetch_one
+from vector_index import get_vector_index, cosine_similarities
 
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="scenario",
-        password="Skaqn3301",
-        database="nursing_scenarios"
-    )
+# 추가된 질병이 메인 페이지 샘플에 나타나기까지 걸리는 최대 시간(초)
+DISEASE_IDS_TTL = int(os.getenv("DISEASE_IDS_TTL", "600"))
 
 def search_disease_info(title):
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-    query = "SELECT title, paragraphs, info, vector FROM Disease_info WHERE title LIKE %s OR paragraphs LIKE %s OR info LIKE %s"
-    like_query = "%" + title + "%"
-    cursor.execute(query, (like_query, like_query, like_query))
-    result = cursor.fetchall()
-    cursor.close()
-    connection.close()
-    return result
+    # LIKE '%q%' 전체 스캔 대신 역색인에서 paragraphs/info에 검색어가 포함된 행만 찾는다
+    index = get_vector_index()
+    positions, _ = index.text.search(title)
+    return [index.rows[i] for i in positions], index.matrix[positions]
 
 def get_disease_info_by_title(title):
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
     query = "SELECT title, paragraphs, info FROM Disease_info WHERE title = %s"
-    cursor.execute(query, (title,))
-    result = cursor.fetchone()
-    cursor.close()
-    connection.close()
-    return result
+    return fetch_one(query, (title,))
+
+def get_disease_info_by_id(disease_id):
+    query = "SELECT id, title, paragraphs, info FROM Disease_info WHERE id = %s"
+    return fetch_one(query, (disease_id,))
+
+# id 배열만 프로세스에 한 번 불러와서 모든 세션이 공유한다
+@st.cache_resource(show_spinner=False, ttl=DISEASE_IDS_TTL)
+def get_disease_ids():
+    rows = fetch_all("SELECT id FROM Disease_info", dictionary=False)
+    return np.array([row[0] for row in rows])
+
+def invalidate_disease_ids():
+    get_disease_ids.clear()
+
+def sample_disease_ids(count):
+    """ 캐시된 id 배열에서 count개를 무작위로 뽑는다. 질병 수와 관계없이 O(count). """
+    ids = get_disease_ids()
+    positions = random.sample(range(len(ids)), min(count, len(ids)))
+    return [ids[i].item() for i in positions]
+
+def get_disease_titles(disease_ids, cursor=None):
+    """ 뽑은 순서대로 id와 제목만 가져온다. 그 사이 삭제된 질병은 빠진다.
+
+    cursor(dictionary=True)를 넘기면 이미 빌린 연결에서 실행한다.
+    """
+    if not disease_ids:
+        return []
+    format_strings = ','.join(['%s'] * len(disease_ids))
+    query = f"SELECT id, title FROM Disease_info WHERE id IN ({format_strings})"
+    if cursor is None:
+        rows = fetch_all(query, tuple(disease_ids))
+    else:
+        cursor.execute(query, tuple(disease_ids))
+        rows = cursor.fetchall()
+    by_id = {row['id']: row for row in rows}
+    return [by_id[disease_id] for disease_id in disease_ids if disease_id in by_id]
 
 def display_disease_info(disease):
     st.subheader(disease['title'])
@@ -47,33 +69,7 @@ def display_disease_info(disease):
         st.write(f"**{key}:** {value}")
 
 def calculate_similarity(search_query, vectors):
-    query_vector = np.array(search_query).reshape(1, -1)
-    vectors = np.array(vectors)
-    cosine_sim = cosine_similarity(query_vector, vectors)
-    return cosine_sim[0]
-
-def translate_to_english(text):
-    url_for_deepl = 'https://api-free.deepl.com/v2/translate'
-    params = {
-        'auth_key': 'e50eeac8-9e87-45dd-a7a1-b2a4cdf9f91c:fx',
-        'text': text,
-        'source_lang': 'KO',
-        'target_lang': 'EN'
-    }
-    response = requests.post(url_for_deepl, data=params, verify=False)
-    
-    # Check if the request was successful
-    if response.status_code != 200:
-        st.error(f"Translation request failed with status code: {response.status_code}")
-        return text
-    
-    # Attempt to parse the JSON response
-    try:
-        return response.json()['translations'][0]["text"]
-    except (KeyError, IndexError, json.JSONDecodeError) as e:
-        st.error(f"Error parsing translation response: {e}")
-        st.error(f"Response content: {response.content}")
-        return text
+    return cosine_similarities(search_query, vectors)
 
 def load_page():
     st.title("질병 정보 검색")
@@ -100,27 +96,16 @@ def load_page():
         search_query = st.text_input("질병명을 입력하세요:", st.session_state.search_query)
         if search_query:
             # 한글 입력 여부 확인 및 번역 처리
-            if any('\uac00' <= char <= '\ud7a3' for char in search_query):
+            if contains_hangul(search_query):
                 search_query = translate_to_english(search_query)
             
             st.session_state.search_query = search_query
             if st.button("검색"):
-                search_results = search_disease_info(search_query)
-                
-                # 검색어가 info와 paragraphs에 포함된 경우만 유지
-                filtered_results = []
-                for result in search_results:
-                    paragraphs = json.loads(result['paragraphs'])
-                    info = json.loads(result['info'])
-                    paragraphs_text = " ".join(paragraphs).lower()
-                    info_text = " ".join([str(value) for key, value in info.items()]).lower()
-                    if search_query.lower() in paragraphs_text or search_query.lower() in info_text:
-                        filtered_results.append(result)
-                
+                # 검색어가 info와 paragraphs에 포함된 경우만 반환된다
+                filtered_results, vectors = search_disease_info(search_query)
                 st.session_state.search_results = filtered_results
 
                 if filtered_results:
-                    vectors = [json.loads(d['vector']) for d in filtered_results]
                     search_vector = np.zeros(len(vectors[0]))  # 이 부분은 벡터의 길이에 맞게 수정 필요
                     similarity_scores = calculate_similarity(search_vector, vectors)
                     st.session_state.similarity_results = [
@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+
+class DiskCache:
+    """ 세션과 프로세스가 함께 쓰는 SQLite 키-값 캐시.
+
+    값은 str 또는 bytes. 오래된 항목(max_age 초)과, 개수(max_entries)/용량(max_bytes)을 넘는
+    가장 오래 사용되지 않은 항목부터 제거한다.
+    """
+
+    def __init__(self, name, max_entries=10000, max_bytes=None, max_age=None, evict_every=50):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        self.path = os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self.writes = 0
+        self.local = threading.local()
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB,
+                size INTEGER,
+                created_at REAL,
+                accessed_at REAL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+
+    def _connection(self):
+        # sqlite3 연결은 스레드 간에 공유하지 않는다
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+        return connection
+
+    def get(self, key, max_age=None):
+        # max_age를 주면 이 조회에 한해 캐시 기본값 대신 사용한다
+        max_age = self.max_age if max_age is None else max_age
+        connection = self._connection()
+        row = connection.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        now = time.time()
+        if max_age is not None and now - created_at > max_age:
+            connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return None
+        connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return value
+
+    def set(self, key, value):
+        size = len(value.encode('utf-8')) if isinstance(value, str) else len(value)
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, value, size, now, now)
+        )
+        self.writes += 1
+        if self.writes % self.evict_every == 0:
+            self.evict()
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def evict(self):
+        connection = self._connection()
+        if self.max_age is not None:
+            connection.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.max_age,))
+        if self.max_entries is not None:
+            connection.execute("""
+                DELETE FROM entries WHERE key IN (
+                    SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+        if self.max_bytes is not None:
+            connection.execute("""
+                DELETE FROM entries WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS total FROM entries
+                    ) WHERE total > ?
+                )
+            """, (self.max_bytes,))
+
+    def stats(self):
+        count, total = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": total}
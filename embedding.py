@@ -0,0 +1,190 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.connection import Client
+import streamlit as st
+from embedding_server import MODEL_NAME, SERVICE_HOST, SERVICE_PORT, SERVICE_AUTHKEY
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+# "service": 공용 임베딩 서비스(embedding_server.py) 사용, "local": 프로세스 안에서 모델 로드
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "service")
+# 서비스 연결/응답을 기다리는 최대 시간(초)과, 실패한 뒤 로컬 모델을 쓰다가 서비스를 다시 시도하기까지의 시간(초)
+EMBEDDING_SERVICE_TIMEOUT = float(os.getenv("EMBEDDING_SERVICE_TIMEOUT", "10"))
+EMBEDDING_SERVICE_RETRY = float(os.getenv("EMBEDDING_SERVICE_RETRY", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text):
+    # 모델이 대소문자를 구분하지 않으므로 소문자 + 공백 정리한 문자열을 캐시 키로 쓴다
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """ 정규화된 질의 문자열 -> 임베딩 벡터의 크기 제한 LRU 캐시. """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            vector = self.entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key, vector):
+        with self.lock:
+            self.entries[key] = vector
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "max_size": self.max_size}
+
+
+class EmbeddingServiceClient:
+    """ 임베딩 서비스에 encode 요청을 보내는 얇은 클라이언트. 스레드(세션)마다 연결을 하나씩 유지한다.
+
+    연결이나 응답이 timeout을 넘기면 TimeoutError(OSError)를 낸다. 실패하면 retry_after초 동안은 시도하지 않는다.
+    """
+
+    def __init__(self, address, authkey, timeout=EMBEDDING_SERVICE_TIMEOUT, retry_after=EMBEDDING_SERVICE_RETRY):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.local = threading.local()
+        self.down_until = 0.0
+
+    def available(self):
+        return self.authkey is not None and time.monotonic() >= self.down_until
+
+    def mark_down(self):
+        self.down_until = time.monotonic() + self.retry_after
+
+    def _connect(self):
+        # Client()에는 timeout이 없어서 연결(인증 포함)은 데몬 스레드에서 하고 여기서는 timeout까지만 기다린다
+        result = {}
+        lock = threading.Lock()
+
+        def connect():
+            try:
+                connection = Client(self.address, authkey=self.authkey)
+            except Exception as e:
+                result["error"] = e
+                return
+            with lock:
+                if result.get("abandoned"):
+                    connection.close()  # 너무 늦게 연결되었다
+                else:
+                    result["connection"] = connection
+
+        thread = threading.Thread(target=connect, daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        with lock:
+            if "connection" in result:
+                return result["connection"]
+            result["abandoned"] = True
+        if "error" in result:
+            raise result["error"]
+        raise TimeoutError(f"Embedding service did not accept the connection within {self.timeout}s")
+
+    def _request(self, message):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = self._connect()
+        try:
+            connection.send(message)
+            if not connection.poll(self.timeout):
+                raise TimeoutError(f"Embedding service did not respond within {self.timeout}s")
+            status, payload = connection.recv()
+        except (EOFError, OSError):
+            # 서비스가 재시작되었거나 응답이 없으면 다음 요청에서 다시 연결한다
+            connection.close()
+            self.local.connection = None
+            raise
+        if status != "ok":
+            raise RuntimeError(f"Embedding service error: {payload}")
+        return payload
+
+    def encode(self, texts):
+        return self._request(("encode", list(texts)))
+
+    def stats(self):
+        return self._request(("stats",))
+
+
+@st.cache_resource(show_spinner=False)
+def get_local_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(MODEL_NAME)
+
+
+@st.cache_resource(show_spinner=False)
+def get_service_client():
+    if SERVICE_AUTHKEY is None:
+        logger.warning("EMBEDDING_SERVICE_AUTHKEY가 없어 임베딩 서비스 대신 로컬 모델을 사용합니다.")
+    return EmbeddingServiceClient((SERVICE_HOST, SERVICE_PORT), SERVICE_AUTHKEY)
+
+
+def encode_texts(texts):
+    """ 임베딩 서비스로 encode한다. 서비스가 없거나 실패하면 로컬 모델을 쓰고, 잠시 뒤 서비스를 다시 시도한다. """
+    if EMBEDDING_BACKEND == "service":
+        client = get_service_client()
+        if client.available():
+            try:
+                return client.encode(texts)
+            except (OSError, EOFError) as e:
+                client.mark_down()
+                logger.warning(
+                    "임베딩 서비스(%s:%s)를 사용할 수 없어 %s초 동안 로컬 모델을 사용합니다: %s",
+                    *client.address, client.retry_after, e
+                )
+    return get_local_model().encode(texts)
+
+
+@st.cache_resource(show_spinner=False)
+def get_embedding_cache():
+    return EmbeddingCache(EMBEDDING_CACHE_SIZE)
+
+
+def encode_queries(texts):
+    """ 여러 질의를 한 번에 임베딩한다. 캐시에 없는 질의만 모아서 encode를 한 번 호출한다. """
+    cache = get_embedding_cache()
+    keys = [normalize_query(text) for text in texts]
+
+    vectors = {}
+    missing = []
+    for key in keys:
+        if key in vectors or key in missing:
+            continue
+        vector = cache.get(key)
+        if vector is None:
+            missing.append(key)
+        else:
+            vectors[key] = vector
+
+    if missing:
+        for key, vector in zip(missing, encode_texts(missing)):
+            vector.setflags(write=False)
+            cache.put(key, vector)
+            vectors[key] = vector
+
+    return [vectors[key] for key in keys]
+
+
+def embedding_cache_stats():
+    return get_embedding_cache().stats()
@@ -0,0 +1,122 @@
+import argparse
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Listener
+
+MODEL_NAME = 'paraphrase-MiniLM-L6-v2'
+SERVICE_HOST = os.getenv("EMBEDDING_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("EMBEDDING_SERVICE_PORT", "6010"))
+# pickle로 주고받으므로 키를 아는 클라이언트만 받는다. 기본값은 두지 않는다
+SERVICE_AUTHKEY = os.getenv("EMBEDDING_SERVICE_AUTHKEY", "").encode() or None
+
+
+class MicroBatcher:
+    """ 여러 연결에서 동시에 들어온 encode 요청을 모아 한 번의 forward pass로 처리한다. """
+
+    def __init__(self, model, max_batch=64, max_wait_ms=5):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "texts": 0, "batches": 0}
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def encode(self, texts):
+        future = Future()
+        self.requests.put((texts, future))
+        return future.result()
+
+    def _collect(self):
+        # 첫 요청을 기다린 뒤 max_wait 동안 또는 max_batch가 찰 때까지 더 모은다
+        batch = [self.requests.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                vectors = self.model.encode(texts, batch_size=max(len(texts), 1))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for request_texts, future in batch:
+                future.set_result(vectors[start:start + len(request_texts)])
+                start += len(request_texts)
+            with self.lock:
+                self.stats["requests"] += len(batch)
+                self.stats["texts"] += len(texts)
+                self.stats["batches"] += 1
+
+
+def handle_connection(connection, batcher):
+    with connection:
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                return
+            command = message[0]
+            try:
+                if command == "encode":
+                    connection.send(("ok", batcher.encode(message[1])))
+                elif command == "stats":
+                    with batcher.lock:
+                        connection.send(("ok", dict(batcher.stats)))
+                else:
+                    connection.send(("error", f"unknown command: {command}"))
+            except (EOFError, OSError):
+                return
+            except Exception as e:
+                connection.send(("error", str(e)))
+
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, max_batch=64, max_wait_ms=5):
+    if not SERVICE_AUTHKEY:
+        raise SystemExit("EMBEDDING_SERVICE_AUTHKEY 환경 변수를 설정해야 임베딩 서비스를 시작할 수 있습니다.")
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(MODEL_NAME)
+    batcher = MicroBatcher(model, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    with Listener((host, port), backlog=128, authkey=SERVICE_AUTHKEY) as listener:
+        print(f"임베딩 서비스 시작: {host}:{port} ({MODEL_NAME})")
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception as e:
+                print(f"연결 실패: {e}")
+                continue
+            threading.Thread(target=handle_connection, args=(connection, batcher), daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SentenceTransformer 임베딩 서비스")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.max_batch, args.max_wait_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import threading
+from openai import OpenAI
+
+# LLM_BACKEND: openai (기본) | compatible (LLM_BASE_URL의 OpenAI 호환 서버) | mock (mock_llm_server.py)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_API_KEY = os.getenv("LLM_API_KEY", os.getenv("OPENAI_API_KEY", "API_KEY"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+
+MOCK_LLM_HOST = os.getenv("MOCK_LLM_HOST", "127.0.0.1")
+MOCK_LLM_PORT = int(os.getenv("MOCK_LLM_PORT", "8090"))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def backend_base_url(backend=LLM_BACKEND, base_url=LLM_BASE_URL):
+    if backend == "openai":
+        return base_url  # None이면 OpenAI 기본 주소
+    if backend == "mock":
+        return base_url or f"http://{MOCK_LLM_HOST}:{MOCK_LLM_PORT}/v1"
+    if backend == "compatible":
+        if not base_url:
+            raise ValueError("LLM_BACKEND=compatible에는 LLM_BASE_URL이 필요합니다.")
+        return base_url
+    raise ValueError(f"Unknown LLM backend: {backend}")
+
+
+def create_client(backend=LLM_BACKEND, base_url=LLM_BASE_URL, api_key=LLM_API_KEY):
+    # 재시도는 rate_limiter가 담당하므로 클라이언트 자체 재시도는 끈다
+    return OpenAI(
+        api_key=api_key,
+        base_url=backend_base_url(backend, base_url),
+        timeout=LLM_TIMEOUT,
+        max_retries=0
+    )
+
+
+def get_client():
+    """ 설정으로 고른 백엔드의 클라이언트. 처음 호출될 때 한 번 만든다. """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_client()
+    return _client
+
+
+def set_client(client):
+    # 벤치마크처럼 한 프로세스에서 백엔드를 바꿔야 할 때 사용한다
+    global _client
+    with _client_lock:
+        _client = client
@@ -1,9 +1,10 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
 import import_module  # import_module.py를 임포트
-from utils import load_css, img_to_base64_str, get_db_connection  # 유틸리티 모듈에서 함수 가져오기
+from utils import load_css  # 유틸리티 모듈에서 함수 가져오기
+from assets import list_images, sidebar_logo_uri, hero_image_uri
+from db import connection, fetch_one
 import random
-import os
 import json
 import simulation_list
 import disease_info
@@ -24,8 +25,8 @@ if 'selected_disease' not in st.session_state:
 
 # 사이드바에 이미지를 중앙 정렬하고, 이미지와 메뉴 사이에 여백을 추가하기 위한 마크다운
 st.sidebar.markdown(
-    "<div style='text-align: center; margin-bottom: 30px;'><img src='data:image/png;base64,{}' class='sidebar-logo' width='250'></div>".format(
-        img_to_base64_str("./image/sidebar_logo.png")
+    "<div style='text-align: center; margin-bottom: 30px;'><img src='{}' class='sidebar-logo' width='250'></div>".format(
+        sidebar_logo_uri("./image/sidebar_logo.png")
     ), 
     unsafe_allow_html=True
 )
@@ -46,13 +47,12 @@ with st.sidebar:
         st.session_state['current_page'] = choice
         st.experimental_rerun()
 
-# 지정된 폴더에서 랜덤 이미지를 선택하여 로드하는 함수
+# 지정된 폴더에서 랜덤 이미지를 선택하는 함수 (폴더 목록은 assets에 캐시된다)
 def get_random_image_from_folder(folder_path):
-    image_files = [f for f in os.listdir(folder_path) if f.endswith(('png', 'jpg', 'jpeg', 'webp'))]
+    image_files = list_images(folder_path)
     if not image_files:
         return None
-    random_image = random.choice(image_files)
-    return os.path.join(folder_path, random_image)
+    return random.choice(image_files)
 
 # 페이지 내용 로드
 if st.session_state['current_page'] == "메인 페이지":
@@ -61,34 +61,41 @@ if st.session_state['current_page'] == "메인 페이지":
     # 랜덤 이미지 삽입
     random_image_path = get_random_image_from_folder("./image/mainpage_image")
     if random_image_path:
-        image = img_to_base64_str(random_image_path)
+        image = hero_image_uri(random_image_path)
         st.markdown(
-            "<div class='content-wrapper'><img src='data:image/png;base64,{}' class='mainpage-image'></div>".format(image), 
+            "<div class='content-wrapper'><img src='{}' class='mainpage-image'></div>".format(image), 
             unsafe_allow_html=True
         )
     else:
         st.write("이미지를 불러올 수 없습니다.")
 
+    # 질병은 캐시된 id 배열에서 5개를 뽑고 제목만 가져온다
+    disease_ids = disease_info.sample_disease_ids(5)
+
+    # 마이그레이션 전이면 안내만 하고 시나리오 목록은 건너뛴다
+    scenario_schema_ready = not simulation_list.show_pending_migrations()
+
+    # 두 섹션에 필요한 데이터를 연결 하나로 가져온다
+    with connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        simulations = []
+        if scenario_schema_ready:
+            cursor.execute("SELECT id, disease_name, purpose FROM scenarios ORDER BY created_at DESC LIMIT 5")
+            simulations = cursor.fetchall()
+        sampled_diseases = disease_info.get_disease_titles(disease_ids, cursor)
+        cursor.close()
+
     # 두 개의 섹션 나누기
     col1, col2 = st.columns(2)
 
     # 왼쪽 섹션: 시뮬레이션 리스트 목차
     with col1:
         st.subheader("시뮬레이션 리스트")
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT id FROM scenarios ORDER BY created_at DESC LIMIT 5")
-        simulations = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        
         if simulations:
             for scenario in simulations:
-                parts = scenario['id'].rsplit('_', 2)
-                if len(parts) == 3:
-                    disease_name, purpose, date_str = parts
-                    disease_name = disease_name.replace("_", " ")
-                    title = f"{disease_name} {purpose} 시나리오"
+                # 질병명/목적은 id에서 만든 생성 컬럼이다
+                if scenario['disease_name'] is not None:
+                    title = f"{scenario['disease_name']} {scenario['purpose']} 시나리오"
 
                     if st.button(title, key=scenario['id']):
                         st.session_state.sim_list_selected_scenario = scenario
@@ -102,29 +109,18 @@ if st.session_state['current_page'] == "메인 페이지":
     # 오른쪽 섹션: 랜덤 질병 정보 5개
     with col2:
         st.subheader("질병 정보")
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT title, paragraphs, info FROM Disease_info")
-        all_diseases = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        
-        if all_diseases:
-            for disease in random.sample(all_diseases, 5):
-                if st.button(disease['title'], key=f"disease_{disease['title']}"):
-                    st.session_state['selected_disease'] = disease
+        if sampled_diseases:
+            for disease in sampled_diseases:
+                if st.button(disease['title'], key=f"disease_{disease['id']}"):
+                    # 본문은 상세 페이지에서 id로 불러온다
+                    st.session_state['selected_disease'] = disease['id']
                     st.session_state['current_page'] = "질병 상세"
                     st.experimental_rerun()
 
 elif st.session_state['current_page'] == "시뮬레이션 상세":
     st.subheader("시뮬레이션 상세 정보")
     if st.session_state['selected_simulation']:
-        connection = get_db_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM scenarios WHERE id = %s", (st.session_state['selected_simulation'],))
-        selected_simulation = cursor.fetchone()
-        cursor.close()
-        connection.close()
+        selected_simulation = fetch_one("SELECT * FROM scenarios WHERE id = %s", (st.session_state['selected_simulation'],))
 
         if selected_simulation:
             st.write("**환자 정보:**")
@@ -140,8 +136,10 @@ elif st.session_state['current_page'] == "시뮬레이션 상세":
 
 elif st.session_state['current_page'] == "질병 상세":
     st.subheader("질병 상세 정보")
+    disease = None
     if st.session_state['selected_disease']:
-        disease = st.session_state['selected_disease']
+        disease = disease_info.get_disease_info_by_id(st.session_state['selected_disease'])
+    if disease:
         st.write("**Paragraphs:**")
         paragraphs = json.loads(disease['paragraphs'])
         for para in paragraphs:
@@ -150,6 +148,8 @@ elif st.session_state['current_page'] == "질병 상세":
         info = json.loads(disease['info'])
         for key, value in info.items():
             st.write(f"**{key}: {value}**")
+    elif st.session_state['selected_disease']:
+        st.write("선택한 질병 정보를 불러올 수 없습니다.")
     if st.button("뒤로가기"):
         st.session_state['current_page'] = "메인 페이지"
         st.session_state['selected_disease'] = None
@@ -0,0 +1,160 @@
+import argparse
+from db import connection as db_connection, fetch_all
+from vector_index import json_to_vector, vector_to_blob
+
+# 시나리오 id("질병명_목적_YYYYmmddHHMMSS")를 rsplit('_', 2)와 같은 규칙으로 나누는 식. 형식이 다르면 NULL
+SCENARIO_ID_IS_VALID = "CHAR_LENGTH(id) - CHAR_LENGTH(REPLACE(id, '_', '')) >= 2"
+SCENARIO_DISEASE_NAME_EXPR = (
+    f"IF({SCENARIO_ID_IS_VALID}, "
+    "REPLACE(LEFT(id, CHAR_LENGTH(id) - CHAR_LENGTH(SUBSTRING_INDEX(id, '_', -2)) - 1), '_', ' '), NULL)"
+)
+SCENARIO_PURPOSE_EXPR = f"IF({SCENARIO_ID_IS_VALID}, SUBSTRING_INDEX(SUBSTRING_INDEX(id, '_', -2), '_', 1), NULL)"
+
+# 하위 명령 -> 화면 코드가 기대하는 (테이블, 컬럼) 목록
+SCENARIO_MIGRATIONS = {
+    "scenario-versions": [("scenarios", "uid"), ("scenarios", "version"), ("scenario_versions", "delta")],
+    "scenario-columns": [("scenarios", "disease_name"), ("scenarios", "purpose")],
+}
+_scenario_schema_ready = False
+
+
+def migrate_vectors(batch_size=500):
+    """ Disease_info.vector(JSON 텍스트)를 vector_blob(float32 바이너리)으로 배치 변환한다. """
+    with db_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("ALTER TABLE Disease_info ADD COLUMN IF NOT EXISTS vector_blob BLOB")
+        connection.commit()
+        converted = _convert_vectors(connection, cursor, batch_size)
+        cursor.close()
+    return converted
+
+
+def _convert_vectors(connection, cursor, batch_size):
+    converted = 0
+    last_id = None
+    while True:
+        # 이미 변환된 행은 건너뛰고 id 순서로 한 배치씩 가져온다
+        if last_id is None:
+            cursor.execute(
+                "SELECT id, vector FROM Disease_info WHERE vector_blob IS NULL ORDER BY id LIMIT %s",
+                (batch_size,)
+            )
+        else:
+            cursor.execute(
+                "SELECT id, vector FROM Disease_info WHERE vector_blob IS NULL AND id > %s ORDER BY id LIMIT %s",
+                (last_id, batch_size)
+            )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        updates = [(vector_to_blob(json_to_vector(vector)), disease_id) for disease_id, vector in rows if vector]
+        if updates:
+            cursor.executemany("UPDATE Disease_info SET vector_blob = %s WHERE id = %s", updates)
+            connection.commit()
+        converted += len(updates)
+        print(f"{converted}개 벡터 변환 완료 (마지막 id: {last_id})")
+    return converted
+
+
+def migrate_scenario_versions():
+    """ scenarios에 고정 키(uid)와 낙관적 잠금용 version 컬럼을 추가하고 버전 기록 테이블을 만든다. """
+    with db_connection() as connection:
+        cursor = connection.cursor()
+        # 기존 행에는 AUTO_INCREMENT 값이 차례로 채워진다
+        cursor.execute("""
+            ALTER TABLE scenarios
+                ADD COLUMN IF NOT EXISTS uid BIGINT UNSIGNED NOT NULL AUTO_INCREMENT UNIQUE,
+                ADD COLUMN IF NOT EXISTS version INT UNSIGNED NOT NULL DEFAULT 1
+        """)
+        # delta: scenario_versions.encode_version (다음 버전에서 이 버전을 다시 만드는 압축 델타)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scenario_versions (
+                scenario_uid BIGINT UNSIGNED NOT NULL,
+                version INT UNSIGNED NOT NULL,
+                delta MEDIUMBLOB NOT NULL,
+                created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (scenario_uid, version)
+            )
+        """)
+        # 시나리오를 삭제하면 기록도 함께 지운다. FK 없이 만든 테이블은 남은 고아 기록을 먼저 지운다
+        cursor.execute("DELETE FROM scenario_versions WHERE scenario_uid NOT IN (SELECT uid FROM scenarios)")
+        cursor.execute("""
+            ALTER TABLE scenario_versions
+                ADD CONSTRAINT fk_scenario_versions_scenario FOREIGN KEY IF NOT EXISTS (scenario_uid)
+                REFERENCES scenarios (uid) ON DELETE CASCADE
+        """)
+        connection.commit()
+        cursor.close()
+    print("scenarios.uid/version 컬럼과 scenario_versions 테이블 준비 완료")
+
+
+def migrate_scenario_columns():
+    """ scenarios.id에서 질병명/목적을 STORED 생성 컬럼으로 꺼내고, 목록 검색/정렬용 인덱스를 만든다.
+
+    생성 컬럼은 기존 행에 바로 채워지고 id가 바뀌면(편집) 함께 바뀐다. 비어 있는 created_at은 id의 시각으로 채운다.
+    """
+    with db_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(f"""
+            ALTER TABLE scenarios
+                ADD COLUMN IF NOT EXISTS disease_name VARCHAR(255) AS ({SCENARIO_DISEASE_NAME_EXPR}) STORED,
+                ADD COLUMN IF NOT EXISTS purpose VARCHAR(255) AS ({SCENARIO_PURPOSE_EXPR}) STORED
+        """)
+        cursor.execute("""
+            UPDATE scenarios SET created_at = STR_TO_DATE(SUBSTRING_INDEX(id, '_', -1), '%Y%m%d%H%i%s')
+            WHERE created_at IS NULL AND SUBSTRING_INDEX(id, '_', -1) REGEXP '^[0-9]{14}$'
+        """)
+        print(f"created_at {cursor.rowcount}행 채움")
+        connection.commit()
+        cursor.execute("""
+            ALTER TABLE scenarios
+                ADD INDEX IF NOT EXISTS idx_scenarios_created_at (created_at),
+                ADD INDEX IF NOT EXISTS idx_scenarios_disease_created (disease_name, created_at),
+                ADD INDEX IF NOT EXISTS idx_scenarios_purpose_created (purpose, created_at)
+        """)
+        connection.commit()
+        cursor.close()
+    print("scenarios.disease_name/purpose 컬럼과 인덱스 준비 완료")
+
+
+def pending_scenario_migrations():
+    """ 아직 실행하지 않은 시나리오 마이그레이션 하위 명령 목록. 모두 끝난 뒤에는 다시 확인하지 않는다. """
+    global _scenario_schema_ready
+    if _scenario_schema_ready:
+        return []
+    rows = fetch_all("""
+        SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ('scenarios', 'scenario_versions')
+    """, dictionary=False)
+    existing = {(table, column) for table, column in rows}
+    pending = [
+        command for command, columns in SCENARIO_MIGRATIONS.items()
+        if any(table_column not in existing for table_column in columns)
+    ]
+    _scenario_schema_ready = not pending
+    return pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description="데이터베이스 마이그레이션")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    vectors_parser = subparsers.add_parser("vectors", help="Disease_info 벡터를 float32 BLOB으로 변환")
+    vectors_parser.add_argument("--batch-size", type=int, default=500)
+
+    subparsers.add_parser("scenario-versions", help="시나리오 편집용 uid/version 컬럼과 버전 기록 테이블 추가")
+    subparsers.add_parser("scenario-columns", help="시나리오 id에서 질병명/목적 컬럼을 만들고 인덱스 추가")
+
+    args = parser.parse_args()
+    if args.command == "vectors":
+        migrate_vectors(args.batch_size)
+    elif args.command == "scenario-versions":
+        migrate_scenario_versions()
+    elif args.command == "scenario-columns":
+        migrate_scenario_columns()
+
+
+if __name__ == "__main__":
+    main()
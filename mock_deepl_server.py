@@ -0,0 +1,127 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+MOCK_DEEPL_HOST = "127.0.0.1"
+MOCK_DEEPL_PORT = 8091
+
+# 양방향으로 쓰는 한국어 <-> 영어 질병명. 목록에 없는 텍스트는 그대로 돌려준다
+DEFAULT_TRANSLATIONS = {
+    "폐렴": "Pneumonia",
+    "심근경색": "Myocardial infarction",
+    "당뇨병": "Diabetes",
+    "뇌졸중": "Stroke",
+    "급성 신부전": "Acute kidney injury",
+}
+
+
+class MockDeepLConfig:
+    """ 모의 번역 서버의 응답 지연(초), 응답 상태 코드, 번역 사전. """
+
+    def __init__(self, latency=0.0, status=200, translations=None):
+        self.latency = latency
+        self.status = status
+        self.translations = dict(DEFAULT_TRANSLATIONS, **(translations or {}))
+
+    def translate(self, text, source_lang, target_lang):
+        if source_lang.upper() == "EN":
+            reverse = {en: ko for ko, en in self.translations.items()}
+            return reverse.get(text, text)
+        return self.translations.get(text, text)
+
+
+class MockDeepLHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        params = parse_qsl(self.rfile.read(length).decode("utf-8"))
+        server = self.server
+        with server.lock:
+            server.requests.append(params)
+
+        if not self.path.rstrip("/").endswith("/translate"):
+            self._send_json(404, {"message": "Not found"})
+            return
+        config = server.config
+        time.sleep(config.latency)
+        if config.status != 200:
+            self._send_json(config.status, {"message": "Mock error"})
+            return
+
+        fields = {}
+        texts = []
+        for name, value in params:
+            if name == "text":
+                texts.append(value)
+            else:
+                fields[name] = value
+        if not fields.get("auth_key"):
+            self._send_json(403, {"message": "Authorization failure"})
+            return
+
+        source_lang = fields.get("source_lang", "KO")
+        target_lang = fields.get("target_lang", "EN")
+        self._send_json(200, {"translations": [
+            {"detected_source_language": source_lang, "text": config.translate(text, source_lang, target_lang)}
+            for text in texts
+        ]})
+
+
+class MockDeepLServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, MockDeepLHandler)
+        self.config = config
+        # 받은 요청의 폼 파라미터 목록 (테스트에서 HTTP 호출 여부를 확인한다)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v2/translate"
+
+
+def start_mock_server(host=MOCK_DEEPL_HOST, port=0, config=None):
+    """ 백그라운드 스레드에서 모의 번역 서버를 띄운다. port가 0이면 빈 포트를 쓴다. """
+    server = MockDeepLServer((host, port), config or MockDeepLConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DeepL 번역 API 모의 서버 (DEEPL_API_URL로 지정)")
+    parser.add_argument("--host", default=MOCK_DEEPL_HOST)
+    parser.add_argument("--port", type=int, default=MOCK_DEEPL_PORT)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--status", type=int, default=200, help="200이 아니면 모든 요청에 이 상태 코드로 응답")
+    args = parser.parse_args()
+
+    server = MockDeepLServer((args.host, args.port), MockDeepLConfig(args.latency, args.status))
+    print(f"Mock DeepL server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
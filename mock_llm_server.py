@@ -0,0 +1,247 @@
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from llm_backend import MOCK_LLM_HOST, MOCK_LLM_PORT
+
+# 실제 토큰화 대신 이 글자 수를 토큰 하나로 본다
+CHARS_PER_TOKEN = 3
+
+NURSING_SCENARIO_RESPONSE = (
+    "1. Initial Stage:\n  - 환자 상태: 체온 38.7도, 호흡수 26회/분, SpO2 89%.\n"
+    "  - 예상 간호 중재: 산소 공급, 활력징후 측정, 혈액배양 검체 채취.\n  - 교육 포인트: 저산소증의 초기 징후 사정.\n\n"
+    "2. 1st state/interval:\n  - 환자 상태: 산소 2L 투여 후 SpO2 93%.\n"
+    "  - 예상 간호 중재: 처방된 항생제 투여, 객담 배출 격려.\n  - 교육 포인트: 항생제 투여 전 검체 채취의 중요성.\n\n"
+    "3. 2nd state/interval:\n  - 환자 상태: 혈압 88/54 mmHg, 의식 저하.\n"
+    "  - 예상 간호 중재: 수액 볼루스 투여, 의사에게 보고.\n  - 교육 포인트: 패혈증 조기 인지.\n\n"
+    "4. 3rd state/interval:\n  - 환자 상태: 혈압 110/70 mmHg로 회복, 호흡 안정.\n"
+    "  - 예상 간호 중재: 지속적 모니터링, 퇴원 교육 계획.\n  - 교육 포인트: 재발 예방 교육."
+)
+
+COMBINED_RESPONSE = json.dumps({
+    "patient_details": {
+        "이름": "김민수", "나이": "67", "성별": "남성", "몸무게": "68 kg", "키": "170 cm",
+        "주호소": "3일 전부터 발열과 기침, 호흡곤란", "입원경로": "응급실", "사회력": "흡연 40갑년",
+        "과거병력": "고혈압", "과거수술력": "없음", "가족력": "없음", "약물": "암로디핀 5mg",
+        "1차 진단명": "지역사회획득 폐렴", "추가사항": "없음"
+    },
+    "patient_overview": (
+        "환자 개요(Brief description of client):\n◦ 이름(Name): 김민수\n◦ 나이(Age): 67\n"
+        "◦ 1차 진단명(Primary diagnosis): 지역사회획득 폐렴\n\n자세한 상황 설명:\n발열과 호흡곤란으로 응급실에 내원하였다."
+    ),
+    "scenario": NURSING_SCENARIO_RESPONSE
+}, ensure_ascii=False)
+
+# 시스템/사용자 메시지에 match가 들어 있으면 content로 응답한다 (위에서부터 먼저 맞는 것)
+DEFAULT_RESPONSES = [
+    {"match": "patient_details, patient_overview and scenario", "content": COMBINED_RESPONSE},
+    {
+        "match": "summarizer",
+        "content": (
+            "원인: 세균 또는 바이러스 감염으로 폐포에 염증이 생긴다.\n"
+            "증상: 발열, 기침, 가래, 호흡곤란, 흉통.\n"
+            "예방: 예방접종, 손 위생, 금연.\n"
+            "치료방법: 항생제, 산소요법, 수액 및 해열제 투여."
+        )
+    },
+    {
+        "match": "random patient details",
+        "content": (
+            "이름: 김민수\n나이: 67\n성별: 남성\n몸무게: 68 kg\n키: 170 cm\n"
+            "주호소: 3일 전부터 발열과 기침, 호흡곤란\n입원경로: 응급실\n사회력: 흡연 40갑년, 배우자와 거주\n"
+            "과거병력: 고혈압\n과거수술력: 없음\n가족력: 없음\n약물: 암로디핀 5mg\n1차 진단명: 지역사회획득 폐렴\n추가사항: 없음"
+        )
+    },
+    {
+        "match": "generate a patient information",
+        "content": (
+            "환자 개요(Brief description of client):\n"
+            "◦ 질병명(Disease Name): 폐렴\n◦ 목적(Purpose): 교육\n◦ 이름(Name): 김민수\n◦ 성별(Gender): 남성\n"
+            "◦ 나이(Age): 67\n◦ 키(Height): 170 cm\n◦ 몸무게(Weight): 68 kg\n"
+            "◦ 주호소(Chief complaint): 발열과 기침, 호흡곤란\n◦ 입원경로(History of present illness): 응급실\n"
+            "◦ 사회력(Social history): 흡연 40갑년\n◦ 과거질병력(Past medical history): 고혈압\n"
+            "◦ 과거수술력(Past surgical history & date): 없음\n◦ 가족력(Family medical history): 없음\n"
+            "◦ 약물(Medication): 암로디핀 5mg\n◦ 1차 진단명(Primary diagnosis): 지역사회획득 폐렴\n\n"
+            "자세한 상황 설명:\n환자는 3일 전부터 38.5도의 발열과 누런 가래를 동반한 기침이 있었고 오늘 아침 호흡곤란이 심해져 응급실로 내원하였다."
+        )
+    },
+    {"match": "nusing scenerio", "content": NURSING_SCENARIO_RESPONSE},
+    {"match": "revise a nursing scenario", "content": NURSING_SCENARIO_RESPONSE},
+    {
+        "match": "Revise only the requested stages",
+        "content": "  - 환자 상태: 수정된 환자 상태.\n  - 예상 간호 중재: 수정된 간호 중재.\n  - 교육 포인트: 수정된 교육 포인트."
+    },
+]
+FALLBACK_RESPONSE = "모의 응답입니다."
+
+
+class MockLLMConfig:
+    """ 모의 서버의 응답 지연(첫 토큰까지 초), 처리량(초당 토큰), 오류율, 준비된 응답 목록. """
+
+    def __init__(self, latency=0.5, jitter=0.1, tokens_per_second=50.0, error_rate=0.0, responses=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.responses = (responses or []) + DEFAULT_RESPONSES
+
+    def first_token_delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def response_for(self, messages):
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        for response in self.responses:
+            if response["match"] in prompt:
+                return response["content"]
+        return FALLBACK_RESPONSE
+
+
+def split_tokens(text):
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+
+def estimate_tokens(text):
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+
+        config = self.server.config
+        if config.error_rate and random.random() < config.error_rate:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+                headers={"Retry-After": "1"}
+            )
+            return
+
+        messages = request.get("messages", [])
+        content = config.response_for(messages)
+        prompt_tokens = sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "mock")
+
+        time.sleep(config.first_token_delay())
+        if request.get("stream"):
+            self._stream(completion_id, model, content)
+            return
+
+        time.sleep(estimate_tokens(content) / config.tokens_per_second)
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": estimate_tokens(content),
+                "total_tokens": prompt_tokens + estimate_tokens(content)
+            }
+        })
+
+    def _stream(self, completion_id, model, content):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        interval = 1.0 / self.server.config.tokens_per_second
+        for token in split_tokens(content):
+            send({"content": token})
+            time.sleep(interval)
+        send({}, finish_reason="stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, MockLLMHandler)
+        self.config = config
+
+
+def start_mock_server(host=MOCK_LLM_HOST, port=MOCK_LLM_PORT, config=None):
+    """ 백그라운드 스레드에서 모의 서버를 띄운다. 벤치마크처럼 같은 프로세스에서 쓸 때 사용한다. """
+    server = MockLLMServer((host, port), config or MockLLMConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def load_responses(path):
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 모의 LLM 서버 (LLM_BACKEND=mock)")
+    parser.add_argument("--host", default=MOCK_LLM_HOST)
+    parser.add_argument("--port", type=int, default=MOCK_LLM_PORT)
+    parser.add_argument("--latency", type=float, default=0.5, help="첫 토큰까지 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="지연에 더하는 무작위 편차(초)")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="요청당 생성 속도")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429로 응답할 비율")
+    parser.add_argument("--responses", help='[{"match": "...", "content": "..."}] 형식의 JSON 파일')
+    args = parser.parse_args()
+
+    config = MockLLMConfig(args.latency, args.jitter, args.tokens_per_second, args.error_rate, load_responses(args.responses))
+    server = MockLLMServer((args.host, args.port), config)
+    print(f"Mock LLM server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
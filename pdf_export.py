@@ -0,0 +1,219 @@
+import copy
+import hashlib
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from fpdf import FPDF
+from disk_cache import DiskCache
+
+FONT_FAMILY = 'NanumGothic'
+FONT_PATH = os.getenv("PDF_FONT_PATH", "NanumGothic.ttf")
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "200"))
+PDF_CACHE_MAX_AGE = 30 * 24 * 3600
+# 레이아웃을 바꾸면 올려서 이전에 캐시된 PDF를 쓰지 않게 한다
+PDF_LAYOUT_VERSION = 1
+# 일괄 내보내기에서 PDF를 만드는 프로세스 수
+PDF_EXPORT_WORKERS = int(os.getenv("PDF_EXPORT_WORKERS", str(os.cpu_count() or 1)))
+
+# (문서 클래스, 생성자 인자) -> (한글 폰트를 등록해 둔 빈 문서, {폰트 키: 파싱한 폰트 테이블 pickle})
+_templates = {}
+_templates_lock = threading.Lock()
+_cache = None
+_cache_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def add_korean_font(pdf):
+    pdf.add_font(FONT_FAMILY, '', FONT_PATH)
+
+
+def new_document(document_class=FPDF, **kwargs):
+    """ 한글 폰트가 등록된 새 문서.
+
+    add_font는 (클래스, 인자)마다 프로세스에서 한 번만 하고, 문서는 그 템플릿을 deepcopy해서 만든다.
+    fpdf의 deepcopy는 폰트 테이블(ttfont)을 공유하는데 output()이 이를 제자리에서 subset하므로,
+    문서마다 파싱해 둔 테이블을 pickle에서 복원해 따로 준다.
+    """
+    key = (document_class, tuple(sorted(kwargs.items())))
+    entry = _templates.get(key)
+    if entry is None:
+        with _templates_lock:
+            entry = _templates.get(key)
+            if entry is None:
+                template = document_class(**kwargs)
+                add_korean_font(template)
+                tables = {name: pickle.dumps(font.ttfont) for name, font in template.fonts.items()}
+                entry = _templates[key] = (template, tables)
+    template, tables = entry
+    pdf = copy.deepcopy(template)
+    for name, data in tables.items():
+        pdf.fonts[name].ttfont = pickle.loads(data)
+    # 템플릿을 만든 시각이 아니라 문서를 만든 시각을 기록한다
+    pdf.set_creation_date(datetime.now(timezone.utc))
+    return pdf
+
+
+class PDF(FPDF):
+    def header(self):
+        self.set_font(FONT_FAMILY, '', 13)
+
+    def chapter_title(self, title):
+        self.set_font(FONT_FAMILY, '', 11)
+        self.cell(0, 10, title, 0, 1, 'L')
+        self.ln(10)
+
+    def chapter_body(self, body):
+        self.set_font(FONT_FAMILY, '', 11)
+        self.multi_cell(0, 10, body)
+        self.ln()
+
+    def add_chapter(self, title, body):
+        self.add_page()
+        self.chapter_title(title)
+        self.chapter_body(body)
+
+
+def create_pdf(content):
+    # 시뮬레이션 리스트의 시나리오 PDF
+    pdf = new_document(PDF)
+    pdf.add_chapter('', content)
+    return pdf
+
+
+def create_lines_pdf(content):
+    # 시나리오 생성 페이지의 PDF (줄 단위 A4)
+    pdf = new_document(orientation="P", unit="mm", format="A4")
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_font(FONT_FAMILY, size=12)
+
+    for line in content.split('\n'):
+        pdf.multi_cell(0, 10, line, align='L', new_x="LMARGIN", new_y="NEXT")
+
+    return pdf
+
+
+LAYOUTS = {
+    "chapter": create_pdf,
+    "lines": create_lines_pdf,
+}
+
+
+def render_pdf(content, layout="chapter"):
+    return bytes(LAYOUTS[layout](content).output())
+
+
+def get_pdf_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache("pdfs", max_entries=5000, max_bytes=PDF_CACHE_MAX_MB * 1024 * 1024, max_age=PDF_CACHE_MAX_AGE)
+    return _cache
+
+
+def pdf_cache_key(content, layout="chapter"):
+    payload = f"{PDF_LAYOUT_VERSION}\0{layout}\0{content}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_cached_pdf(content, layout="chapter"):
+    """ 이미 만든 PDF가 있으면 bytes, 없으면 None. PDF를 새로 만들지는 않는다. """
+    return get_pdf_cache().get(pdf_cache_key(content, layout))
+
+
+def get_pdf_bytes(content, layout="chapter"):
+    """ 내용 해시로 캐시된 PDF bytes. 없으면 만들어서 캐시한다. """
+    key = pdf_cache_key(content, layout)
+    cache = get_pdf_cache()
+    pdf_bytes = cache.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = render_pdf(content, layout)
+        cache.set(key, pdf_bytes)
+    return pdf_bytes
+
+
+def preload_fonts():
+    # 일괄 내보내기 프로세스가 시작할 때 레이아웃별 템플릿을 미리 만든다
+    new_document(PDF)
+    new_document(orientation="P", unit="mm", format="A4")
+
+
+def get_export_pool():
+    """ 일괄 내보내기용 프로세스 풀. 각 프로세스는 시작할 때 폰트를 한 번 불러온다.
+
+    Streamlit 서버는 여러 스레드가 돌고 있으므로 fork 대신 spawn으로 시작해서
+    잠금이나 SQLite 연결(get_pdf_cache) 같은 부모 프로세스 상태를 물려받지 않게 한다.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=PDF_EXPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"), initializer=preload_fonts)
+    return _pool
+
+
+def reset_export_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def export_pdf_zip(documents, layout="chapter", zip_path=None):
+    """ (파일 이름, 내용) 목록을 프로세스 풀에서 PDF로 만들어 ZIP 파일에 차례로 기록하고 경로를 반환한다.
+
+    동시에 메모리에 두는 PDF는 작업 중인 몇 개뿐이다. 캐시된 PDF는 다시 만들지 않는다.
+    """
+    if zip_path is None:
+        handle, zip_path = tempfile.mkstemp(suffix=".zip")
+        os.close(handle)
+
+    pool = get_export_pool()
+    window = PDF_EXPORT_WORKERS * 4
+    pending = deque()
+    used_names = set()
+    try:
+        # PDF는 이미 압축되어 있으므로 ZIP에는 그대로 저장한다
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as archive:
+            def write_next():
+                name, future = pending.popleft()
+                archive.writestr(name, future.result())
+
+            for name, content in documents:
+                name = unique_name(name, used_names)
+                pending.append((name, pool.submit(get_pdf_bytes, content, layout)))
+                if len(pending) >= window:
+                    write_next()
+            while pending:
+                write_next()
+    except Exception as e:
+        for _, future in pending:
+            future.cancel()
+        os.remove(zip_path)
+        if isinstance(e, BrokenProcessPool):
+            # 죽은 프로세스가 있는 풀은 다음 내보내기 때 새로 만든다
+            reset_export_pool()
+        raise
+    return zip_path
+
+
+def unique_name(name, used_names):
+    # ZIP 안에서 파일 이름이 겹치면 번호를 붙인다
+    base, ext = os.path.splitext(name)
+    candidate = name
+    number = 2
+    while candidate in used_names:
+        candidate = f"{base} ({number}){ext}"
+        number += 1
+    used_names.add(candidate)
+    return candidate
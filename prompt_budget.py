@@ -0,0 +1,104 @@
+import functools
+import os
+from collections import namedtuple
+import tiktoken
+
+ENCODING_NAME = "cl100k_base"
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "16000"))  # 16,385 토큰을 넘지 않도록 설정
+
+# 예산이 넘치면 우선순위가 낮은 섹션부터 잘라낸다
+SECTION_PRIORITIES = {
+    "background": 0,
+    "patient_info": 1,
+    "scenario": 1,
+    "instructions": 2,
+}
+
+# 채팅 메시지 하나마다 붙는 형식 토큰과 응답 시작 토큰
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+PromptSection = namedtuple('PromptSection', ['name', 'text', 'priority', 'max_tokens'])
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(encoding_name=ENCODING_NAME):
+    # 인코더는 로드 비용이 크므로 프로세스에서 한 번만 만든다
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text, encoding_name=ENCODING_NAME):
+    return len(get_encoding(encoding_name).encode(text))
+
+
+def count_message_tokens(messages, encoding_name=ENCODING_NAME):
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE + count_tokens(message["role"], encoding_name) + count_tokens(message["content"], encoding_name)
+    return total
+
+
+def decode_tokens(tokens, encoding_name=ENCODING_NAME):
+    # 멀티바이트 문자 중간에서 잘린 경우 깨진 마지막 글자는 버린다
+    return get_encoding(encoding_name).decode(tokens).rstrip('\ufffd')
+
+
+def truncate_tokens(text, max_tokens, encoding_name=ENCODING_NAME):
+    tokens = get_encoding(encoding_name).encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return decode_tokens(tokens[:max_tokens], encoding_name)
+
+
+class PromptBudget:
+    """ 섹션(instructions, patient_info, background 등) 단위로 프롬프트를 모으고 토큰 예산에 맞춘다.
+
+    섹션은 추가한 순서대로 이어 붙인다. 예산을 넘으면 우선순위가 가장 낮은 섹션부터
+    정확한 토큰 수만큼 뒤쪽을 잘라내므로 지시문이 잘리지 않는다.
+    """
+
+    def __init__(self, max_tokens=PROMPT_MAX_TOKENS, encoding_name=ENCODING_NAME):
+        self.max_tokens = max_tokens
+        self.encoding_name = encoding_name
+        self.sections = []
+
+    def add(self, name, text, priority=None, max_tokens=None):
+        # max_tokens를 주면 전체 예산과 별개로 이 섹션에 할당할 최대 토큰 수가 된다
+        if priority is None:
+            priority = SECTION_PRIORITIES.get(name, SECTION_PRIORITIES["instructions"])
+        self.sections.append(PromptSection(name, str(text), priority, max_tokens))
+        return self
+
+    def build(self, reserved_tokens=0):
+        """ (프롬프트, 토큰 수) 반환. 토큰 수는 섹션 이름별 합계와 reserved, trimmed, total을 담는다. """
+        encoding = get_encoding(self.encoding_name)
+        tokens = [encoding.encode(section.text) for section in self.sections]
+        original_counts = [len(section_tokens) for section_tokens in tokens]
+
+        for i, section in enumerate(self.sections):
+            if section.max_tokens is not None and len(tokens[i]) > section.max_tokens:
+                tokens[i] = tokens[i][:section.max_tokens]
+
+        over = sum(len(section_tokens) for section_tokens in tokens) + reserved_tokens - self.max_tokens
+        # 우선순위가 낮은 섹션부터, 같은 우선순위라면 뒤쪽 섹션부터 자른다
+        for i in sorted(range(len(self.sections)), key=lambda i: (self.sections[i].priority, -i)):
+            if over <= 0:
+                break
+            cut = min(over, len(tokens[i]))
+            tokens[i] = tokens[i][:len(tokens[i]) - cut]
+            over -= cut
+
+        texts = []
+        token_counts = {}
+        for section, section_tokens, original_count in zip(self.sections, tokens, original_counts):
+            if len(section_tokens) == original_count:
+                texts.append(section.text)
+            else:
+                texts.append(decode_tokens(section_tokens, self.encoding_name))
+            token_counts[section.name] = token_counts.get(section.name, 0) + len(section_tokens)
+
+        prompt = "".join(texts)
+        token_counts["reserved"] = reserved_tokens
+        token_counts["trimmed"] = sum(original_counts) - sum(len(section_tokens) for section_tokens in tokens)
+        token_counts["total"] = len(encoding.encode(prompt)) + reserved_tokens
+        return prompt, token_counts
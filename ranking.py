@@ -0,0 +1,56 @@
+import heapq
+from collections import namedtuple
+
+RankedDisease = namedtuple('RankedDisease', ['id', 'title', 'similarity', 'occurrences'])
+
+
+def rank_diseases(index, query_vectors, query_texts, threshold=0.9, top_k=50, keyword_top_k=9, title_terms=None):
+    """ 여러 질의 변형(복수형/단수형 등)의 의미 매칭과 키워드 매칭을 한 번에 점수화한다.
+
+    반환값: (유사도 순 상위 top_k, 키워드로만 찾은 결과 중 등장 횟수 순 상위 keyword_top_k)
+    title_terms를 주면 top_k로 자르기 전에 제목에 그중 하나가 들어간 행만 첫 번째 목록에 남긴다.
+    각 항목은 행 전체가 아니라 RankedDisease(id, title, similarity, occurrences)이며,
+    본문이 필요하면 index.row(id)로 가져온다.
+    """
+    # 위치(행 번호) -> 변형들 중 최대 유사도 / 최대 등장 횟수
+    similarities = {}
+    occurrences = {}
+    variants = {}
+    for text, vector in zip(query_texts, query_vectors):
+        variants.setdefault(text.lower(), vector)
+
+    for vector in variants.values():
+        positions, scores = index.search(vector, threshold)
+        for position, score in zip(positions.tolist(), scores.tolist()):
+            if score > similarities.get(position, float('-inf')):
+                similarities[position] = score
+
+    semantic_hits = set(similarities)
+    for text in variants:
+        positions, counts = index.text.search(text)
+        for position, count in zip(positions.tolist(), counts.tolist()):
+            if position not in semantic_hits and count > occurrences.get(position, 0):
+                occurrences[position] = count
+
+    # 키워드로만 찾은 행은 변형별 정확한 유사도 중 최댓값을 쓴다
+    keyword_positions = list(occurrences)
+    for vector in variants.values():
+        scores = index.scores(vector, keyword_positions)
+        for position, score in zip(keyword_positions, scores.tolist()):
+            if score > similarities.get(position, float('-inf')):
+                similarities[position] = score
+
+    def ranked(position):
+        row = index.rows[position]
+        return RankedDisease(row['id'], row['title'], similarities[position], occurrences.get(position, 0))
+
+    semantic_candidates = similarities
+    if title_terms is not None:
+        terms = [term.lower() for term in title_terms]
+        semantic_candidates = [
+            position for position in similarities
+            if any(term in index.rows[position]['title'].lower() for term in terms)
+        ]
+    top_semantic = heapq.nlargest(top_k, semantic_candidates, key=similarities.get)
+    top_keyword = heapq.nlargest(keyword_top_k, occurrences, key=occurrences.get)
+    return [ranked(p) for p in top_semantic], [ranked(p) for p in top_keyword]
@@ -0,0 +1,174 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+import openai
+
+# 공급자 한도 (분당 요청 수 / 분당 토큰 수)와 동시에 보낼 수 있는 요청 수
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "3500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "90000"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+# 재시도 대기 시간(초): min(BACKOFF_MAX, BACKOFF_BASE * 2^시도) 범위 안에서 무작위
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "1"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "30"))
+# 응답 길이를 모를 때 토큰 버킷에서 미리 빼 두는 응답 토큰 수
+DEFAULT_COMPLETION_TOKENS = 1000
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+class TokenBucket:
+    """ 분당 rate_per_minute 만큼 채워지는 토큰 버킷. 잔량이 모자라면 채워질 때까지 기다린다. """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.available = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        # 한 번에 버킷보다 큰 양을 요청하면 가득 찰 때까지만 기다린다
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, amount):
+        # 실제 사용량이 추정과 달랐을 때 차이만큼 돌려주거나 더 뺀다 (음수 잔량은 다음 요청이 기다린다)
+        with self.lock:
+            self._refill()
+            self.available = min(self.capacity, self.available - amount)
+
+
+class RateLimiter:
+    """ OpenAI 호출 전체가 함께 쓰는 요청/토큰 버킷, 동시 실행 제한, 재시도. """
+
+    def __init__(self, rpm=OPENAI_RPM, tpm=OPENAI_TPM, max_concurrency=OPENAI_MAX_CONCURRENCY,
+                 max_retries=OPENAI_MAX_RETRIES, backoff_base=OPENAI_BACKOFF_BASE, backoff_max=OPENAI_BACKOFF_MAX):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "in_flight": 0, "retries": 0, "failures": 0, "wait_total_ms": 0.0, "wait_max_ms": 0.0}
+
+    @contextmanager
+    def slot(self, estimated_tokens):
+        """ 동시 실행 자리와 요청/토큰 한도를 확보한다. 기다린 시간은 stats에 남는다. """
+        started = time.perf_counter()
+        self.slots.acquire()
+        try:
+            self.requests.acquire(1)
+            self.tokens.acquire(estimated_tokens)
+            waited_ms = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.stats["calls"] += 1
+                self.stats["in_flight"] += 1
+                self.stats["wait_total_ms"] += waited_ms
+                self.stats["wait_max_ms"] = max(self.stats["wait_max_ms"], waited_ms)
+            try:
+                yield
+            finally:
+                with self.lock:
+                    self.stats["in_flight"] -= 1
+        finally:
+            self.slots.release()
+
+    def backoff(self, attempt, error):
+        # 서버가 Retry-After를 알려주면 그만큼은 기다린다
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            delay = max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+        return delay
+
+    def call(self, request, estimated_tokens, usage_tokens=None):
+        """ request()를 한도 안에서 실행하고 재시도 가능한 오류면 지터를 준 지수 백오프로 다시 시도한다.
+
+        usage_tokens(result)가 실제 사용 토큰 수를 돌려주면 추정치와의 차이를 토큰 버킷에 반영한다.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.slot(estimated_tokens):
+                    result = request()
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    with self.lock:
+                        self.stats["failures"] += 1
+                    raise
+                with self.lock:
+                    self.stats["retries"] += 1
+                time.sleep(self.backoff(attempt, e))
+                continue
+
+            if usage_tokens is not None:
+                used = usage_tokens(result)
+                if used is not None:
+                    self.tokens.adjust(used - estimated_tokens)
+            return result
+
+    def stream(self, request, estimated_tokens):
+        """ 스트리밍 요청용. 연결 단계에서만 재시도하고, 응답이 끝날 때까지 동시 실행 자리를 잡아 둔다. """
+        for attempt in range(self.max_retries + 1):
+            with self.slot(estimated_tokens):
+                try:
+                    stream = request()
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= self.max_retries:
+                        with self.lock:
+                            self.stats["failures"] += 1
+                        raise
+                    error = e
+                else:
+                    yield from stream
+                    return
+            with self.lock:
+                self.stats["retries"] += 1
+            time.sleep(self.backoff(attempt, error))
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats, max_concurrency=self.max_concurrency)
+        stats["wait_avg_ms"] = stats["wait_total_ms"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+def rate_limiter_stats():
+    return get_rate_limiter().get_stats()
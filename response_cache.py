@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+import threading
+from collections import namedtuple
+from disk_cache import DiskCache
+
+# GPT 응답 캐시는 명시적으로 켜야 동작한다 (GPT_RESPONSE_CACHE=1)
+RESPONSE_CACHE_ENABLED = os.getenv("GPT_RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("GPT_RESPONSE_CACHE_MAX_ENTRIES", "20000"))
+RESPONSE_CACHE_MAX_MB = int(os.getenv("GPT_RESPONSE_CACHE_MAX_MB", "200"))
+RESPONSE_CACHE_MAX_AGE = 30 * 24 * 3600
+
+DAY = 24 * 3600
+
+# 서비스별 캐시 정책. max_age가 None이면 그 서비스의 응답은 캐시하지 않는다.
+CachePolicy = namedtuple('CachePolicy', ['max_age'])
+NO_CACHE = CachePolicy(max_age=None)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache(
+                    "gpt_responses",
+                    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                    max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+                    max_age=RESPONSE_CACHE_MAX_AGE
+                )
+    return _cache
+
+
+def cache_key(model, messages, params):
+    # 모델, 메시지, 파라미터가 모두 같으면 같은 키가 된다
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_cached_response(policy, model, messages, params):
+    """ (캐시 키, 캐시된 응답)을 반환한다. 캐시를 쓰지 않는 경우 키는 None. """
+    if not RESPONSE_CACHE_ENABLED or policy.max_age is None:
+        return None, None
+    key = cache_key(model, messages, params)
+    return key, get_response_cache().get(key, max_age=policy.max_age)
+
+
+def store_response(key, response):
+    if key is not None:
+        get_response_cache().set(key, response)
+
+
+def delete_response(key):
+    if key is not None:
+        get_response_cache().delete(key)
@@ -1,17 +1,20 @@
 import streamlit as st
-from io import BytesIO
-from fpdf import FPDF
-from GPT_api import NursingScenarioService, SummaryService, ScenarioRevisionService, PatientOverviewService, PatientCreationService
-from utils import get_db_connection
+from GPT_api import NursingScenarioService, ScenarioRevisionService, PatientOverviewService, PatientCreationService, CombinedScenarioService
+from db import execute
+from vector_index import get_vector_index
+from ranking import rank_diseases
 from datetime import datetime
+import os
+import time
 import json
-import requests
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
+import translation
+from embedding import encode_queries
+from summaries import SUMMARY_MAX_LENGTH, summary_key, summarize_selected_info
+from utils import format_patient_info
+from pdf_export import get_pdf_bytes
 
-# SentenceTransformer 모델 로드
-model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+# 환자 정보, 환자 개요, 간호 시나리오를 한 번의 요청으로 생성하는 모드의 기본값
+COMBINED_GENERATION = os.getenv("GPT_COMBINED_MODE", "0") == "1"
 
 def reset_session():
     for key in list(st.session_state.keys()):
@@ -20,9 +23,6 @@ def reset_session():
     st.session_state['generator_page'] = 1
 
 def save_scenario_to_mariadb(patient_info, patient_overview, scenario, doc_id=None):
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    
     if doc_id:
         document_id = doc_id
     else:
@@ -36,36 +36,43 @@ def save_scenario_to_mariadb(patient_info, patient_overview, scenario, doc_id=No
         INSERT INTO scenarios (id, patient_info, patient_overview, scenario, created_at)
         VALUES (%s, %s, %s, %s, %s)
     """
-    cursor.execute(insert_query, (document_id, patient_info_json, patient_overview, scenario, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-    connection.commit()
-    cursor.close()
-    connection.close()
+    execute(insert_query, (document_id, patient_info_json, patient_overview, scenario, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
 
 def create_pdf(content):
-    pdf = FPDF(orientation="P", unit="mm", format="A4")
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_font('NanumGothic', '', 'NanumGothic.ttf', uni=True)
-    pdf.set_font("NanumGothic", size=12)
-
-    for line in content.split('\n'):
-        pdf.multi_cell(0, 10, line, align='L')
-
-    return pdf
+    # 내용 해시로 캐시된 PDF bytes (폰트는 프로세스에서 한 번만 불러온다)
+    return get_pdf_bytes(content, layout="lines")
 
-def generate_pdf_download_link(pdf):
-    pdf_output = BytesIO()
-    pdf.output(pdf_output)
-    pdf_output.seek(0)
+def generate_pdf_download_link(pdf_bytes):
     return st.download_button(
         label="Download PDF",
-        data=pdf_output,
+        data=pdf_bytes,
         file_name="nursing_scenario.pdf",
         mime="application/pdf"
     )
 
-def format_patient_info(details):
-    return ", ".join(f"{key}: {('랜덤' if value == '랜덤' else value)}" for key, value in details.items())
+def render_stream(chunks, to_html, interval=0.05):
+    # 응답이 도착하는 대로 부분 텍스트를 갱신해서 보여준다 (갱신 빈도는 interval초로 제한)
+    placeholder = st.empty()
+    text = ""
+    last_render = 0.0
+    for chunk in chunks:
+        text += chunk
+        now = time.monotonic()
+        if now - last_render >= interval:
+            placeholder.markdown(to_html(text), unsafe_allow_html=True)
+            last_render = now
+    placeholder.markdown(to_html(text), unsafe_allow_html=True)
+    return placeholder, text.strip()
+
+def patient_info_html(patient_info):
+    return f'<div style="width: 700px; white-space: pre-wrap;">{patient_info}</div>'
+
+def scenario_html(scenario):
+    formatted_scenario = "\n\n".join(
+        f'<div style="border:1px solid black; padding: 10px; margin-bottom: 20px;">{part.strip()}</div>'
+        for part in scenario.split("\n\n")
+    )
+    return f'<div style="width: 700px; white-space: pre-wrap;">{formatted_scenario}</div>'
 
 def update_detail():
     key = st.session_state.generator_edit_key
@@ -76,6 +83,36 @@ def update_detail():
             del st.session_state.generator_edit_key
             st.experimental_rerun()
 
+def get_summarized_info(max_length=SUMMARY_MAX_LENGTH):
+    """ 선택된 Disease_info 묶음의 요약을 (id 목록, 길이 제한)별로 한 번만 만들고 모든 단계와 세션이 재사용한다. """
+    selected_info = st.session_state.get('selected_info', [])
+    if not selected_info:
+        return ""
+
+    key = summary_key({info['id'] for info in selected_info}, max_length)
+    summaries = st.session_state.setdefault('generator_summaries', {})
+    if key not in summaries:
+        summaries[key] = summarize_selected_info(selected_info, max_length)
+    return summaries[key]
+
+def generate_all_at_once(patient_details, summarized_info):
+    """ 환자 정보, 환자 개요, 간호 시나리오를 한 번의 요청으로 만들어 각 단계의 세션 값에 채운다. """
+    try:
+        generated_patient_details, patient_overview, scenario = CombinedScenarioService().generate_all(patient_details, summarized_info)
+    except ValueError:
+        # JSON 응답을 해석하지 못하면 기존처럼 단계별로 생성한다
+        st.session_state['generator_generated_patient_details'] = PatientOverviewService().generate_random_details(patient_details, summarized_info)
+        return
+
+    st.session_state['generator_generated_patient_details'] = generated_patient_details
+    if patient_overview:
+        st.session_state['generator_generated_patient_info'] = patient_overview
+        st.session_state.generator_show_scenario_button = True
+    if scenario:
+        st.session_state['generator_generated_scenario'] = scenario
+        # 3페이지에서 환자 정보가 바뀐 것으로 보고 시나리오를 지우지 않도록 한다
+        st.session_state['generator_previous_patient_details'] = generated_patient_details
+
 def next_page():
     if st.session_state.generator_page == 1:
         if 'generator_patient_details' in st.session_state:
@@ -87,24 +124,16 @@ def next_page():
                 if f"generator_{field}_checkbox" not in st.session_state or not st.session_state[f"generator_{field}_checkbox"]:
                     st.session_state['generator_patient_details'][field] = "해당사항 없음"
 
-            # 요약된 정보가 선택되지 않은 경우를 처리
-            if 'selected_info' not in st.session_state or not st.session_state.selected_info:
-                summarized_info = ""
-            else:
-                summary_service = SummaryService()
-                selected_info_text = "\n".join([json.dumps(info, ensure_ascii=False) for info in st.session_state.selected_info])
-                # 선택된 정보가 너무 많으면 자르기
-                max_info_length = 1000
-                if len(selected_info_text) > max_info_length:
-                    selected_info_text = selected_info_text[:max_info_length] + '...'
-                summarized_info = summary_service.summarize_info(selected_info_text, max_length=500)
-
+            summarized_info = get_summarized_info()
             st.session_state['generator_summarized_info'] = summarized_info
 
-            overview_service = PatientOverviewService()
             patient_details = st.session_state.get('generator_patient_details', {})
-            generated_patient_details = overview_service.generate_random_details(patient_details, summarized_info)
-            st.session_state['generator_generated_patient_details'] = generated_patient_details
+            if st.session_state.get('generator_combined_mode', COMBINED_GENERATION):
+                generate_all_at_once(patient_details, summarized_info)
+            else:
+                overview_service = PatientOverviewService()
+                generated_patient_details = overview_service.generate_random_details(patient_details, summarized_info)
+                st.session_state['generator_generated_patient_details'] = generated_patient_details
 
         st.session_state.generator_page += 1
     elif st.session_state.generator_page == 2:
@@ -114,76 +143,9 @@ def prev_page():
     st.session_state.generator_page -= 1
 
 def translate_to_english(text):
-    url_for_deepl = 'https://api-free.deepl.com/v2/translate'
-    params = {
-        'auth_key': 'API_key',  # Replace with your DeepL API key
-        'text': text,
-        'source_lang': 'KO',
-        'target_lang': 'EN'
-    }
-    response = requests.post(url_for_deepl, data=params, verify=False)
-    
-    # Check if the request was successful
-    if response.status_code != 200:
-        st.error(f"Translation request failed with status code: {response.status_code}")
-        return text
-    
-    # Attempt to parse the JSON response
-    try:
-        translated_text = response.json()['translations'][0]["text"]
-        st.session_state['generator_disease_name_translated'] = translated_text
-        return translated_text
-    except (KeyError, IndexError, json.JSONDecodeError) as e:
-        st.error(f"Error parsing translation response: {e}")
-        st.error(f"Response content: {response.content}")
-        return text
-
-def calculate_similarity(search_vector, vectors):
-    query_vector = np.array(search_vector).reshape(1, -1)
-    vectors = np.array(vectors)
-    cosine_sim = cosine_similarity(query_vector, vectors)
-    return cosine_sim[0]
-
-def search_disease_by_vector(query_vector, query_text):
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT id, title, paragraphs, info, vector
-        FROM Disease_info
-    """)
-    results = cursor.fetchall()
-    cursor.close()
-    connection.close()
-
-    # 벡터 데이터를 추출하여 유사도 계산
-    vectors = [json.loads(result['vector']) for result in results]
-    similarities = calculate_similarity(query_vector, vectors)
-    
-    # 유사도가 0.9 이상인 결과 필터링
-    threshold = 0.9
-    filtered_results = [result for result, similarity in zip(results, similarities) if similarity >= threshold]
-
-    # 검색어가 포함된 결과 추가
-    def count_occurrences(text, query):
-        return text.lower().count(query.lower())
-
-    for result in results:
-        paragraphs_text = " ".join(json.loads(result['paragraphs']))
-        info_text = " ".join(value for key, value in json.loads(result['info']).items())
-        text_content = paragraphs_text + " " + info_text
-        if query_text.lower() in text_content.lower():
-            if result not in filtered_results:
-                result['occurrences'] = count_occurrences(text_content, query_text)
-                filtered_results.append(result)
-    
-    # 유사도 기준으로 결과 정렬
-    sorted_results = sorted(filtered_results, key=lambda x: similarities[results.index(x)] if x in results else 0, reverse=True)
-
-    # 검색어 포함된 결과에서 occurrences 기준으로 상위 10개 추출
-    filtered_sorted_results = sorted([result for result in results if 'occurrences' in result],
-                                     key=lambda x: x['occurrences'], reverse=True)[:9]
-
-    return sorted_results, filtered_sorted_results
+    translated_text = translation.translate_to_english(text)
+    st.session_state['generator_disease_name_translated'] = translated_text
+    return translated_text
 
 if 'expanded_expanders' not in st.session_state:
     st.session_state['expanded_expanders'] = set()
@@ -229,7 +191,7 @@ def load_page():
         st.text_input("목적", key="generator_purpose")
         
         if disease_name:
-            if any('\uac00' <= char <= '\ud7a3' for char in disease_name):
+            if translation.contains_hangul(disease_name):
                 disease_name_translated = translate_to_english(disease_name)
                 disease_name_translated_singular = disease_name_translated.rstrip('s')
             else:
@@ -239,19 +201,21 @@ def load_page():
             if 'generator_disease_name_translated' in st.session_state:
                 st.write(f"번역된 질병명: {st.session_state['generator_disease_name_translated']}")
 
-            # 두 가지 질병명 형태로 벡터 생성
-            query_vector_plural = model.encode(st.session_state['generator_disease_name_translated'])
-            query_vector_singular = model.encode(disease_name_translated_singular)
-            query_text_plural = st.session_state['generator_disease_name_translated']
+            query_text_plural = disease_name_translated
             query_text_singular = disease_name_translated_singular
 
-            # 각각의 벡터로 검색 수행
-            sorted_results_plural, filtered_sorted_results_plural = search_disease_by_vector(query_vector_plural, query_text_plural)
-            sorted_results_singular, filtered_sorted_results_singular = search_disease_by_vector(query_vector_singular, query_text_singular)
-            
-            # 검색 결과 합치기 (중복 제거)
-            sorted_results = {result['id']: result for result in sorted_results_plural + sorted_results_singular}.values()
-            filtered_sorted_results = {result['id']: result for result in filtered_sorted_results_plural + filtered_sorted_results_singular}.values()
+            # 두 가지 질병명 형태의 벡터를 한 번에 생성 (캐시된 질의는 모델을 거치지 않는다)
+            query_vector_plural, query_vector_singular = encode_queries([query_text_plural, query_text_singular])
+
+            # 두 형태의 검색 결과를 id 기준으로 합쳐 한 번에 순위를 매긴다
+            index = get_vector_index()
+            # 왼쪽 목록은 제목에 검색어가 있는 결과만 보여주므로 상위 top_k를 고르기 전에 거른다
+            sorted_results, filtered_sorted_results = rank_diseases(
+                index,
+                [query_vector_plural, query_vector_singular],
+                [query_text_plural, query_text_singular],
+                title_terms=[query_text_plural, query_text_singular]
+            )
 
             if sorted_results or filtered_sorted_results:
                 st.write(f"총 {len(sorted_results) + len(filtered_sorted_results)}개의 관련 정보가 발견되었습니다.")
@@ -261,24 +225,25 @@ def load_page():
                 
                 with col1:
                     st.write("### 제목에 검색어 포함")
-                    for result in sorted_results:
-                        if query_text_plural.lower() in result['title'].lower() or query_text_singular.lower() in result['title'].lower():
-                            with st.expander(result['title']):
-                                st.write("**Paragraphs:**")
-                                paragraphs = json.loads(result['paragraphs'])
-                                for para in paragraphs:
-                                    st.write(para)
-                                st.write("**Info:**")
-                                info = json.loads(result['info'])
-                                for key, value in info.items():
-                                    st.write(f"{key}: {value}")
-                                if st.checkbox("이 정보를 사용", key=f"generator_use_title_{result['id']}"):
-                                    st.session_state.selected_info.append(result)
+                    for ranked in sorted_results:
+                        with st.expander(ranked.title):
+                            result = index.row(ranked.id)
+                            st.write("**Paragraphs:**")
+                            paragraphs = json.loads(result['paragraphs'])
+                            for para in paragraphs:
+                                st.write(para)
+                            st.write("**Info:**")
+                            info = json.loads(result['info'])
+                            for key, value in info.items():
+                                st.write(f"{key}: {value}")
+                            if st.checkbox("이 정보를 사용", key=f"generator_use_title_{result['id']}"):
+                                st.session_state.selected_info.append(result)
                 
                 with col2:
                     st.write("### 내용에 검색어 포함 (빈도 순)")
-                    for result in filtered_sorted_results:
-                        with st.expander(result['title']):
+                    for ranked in filtered_sorted_results:
+                        with st.expander(ranked.title):
+                            result = index.row(ranked.id)
                             st.write("**Paragraphs:**")
                             paragraphs = json.loads(result['paragraphs'])
                             for para in paragraphs:
@@ -294,6 +259,7 @@ def load_page():
 
         patient_details_input()
 
+        st.checkbox("환자 정보, 환자 개요, 간호 시나리오를 한 번에 생성", value=COMBINED_GENERATION, key="generator_combined_mode")
 
         st.subheader("현재 입력된 정보")
         disease = st.session_state.get('generator_disease_name', '')
@@ -337,17 +303,18 @@ def load_page():
                 st.error("질병명과 목적을 입력해주세요.")
             else:
                 gpt_service = PatientCreationService()
-                summary_service = SummaryService()
-                
+
                 formatted_patient_info = format_patient_info(st.session_state['generator_generated_patient_details'])
-                selected_info = "\n".join([json.dumps(info, ensure_ascii=False) for info in st.session_state.selected_info])
-                summarized_info = summary_service.summarize_info(selected_info)
+                summarized_info = get_summarized_info()
                 
-                scenario = gpt_service.create_scenario(
-                    disease,
-                    purpose,
-                    formatted_patient_info,
-                    summarized_info
+                _, scenario = render_stream(
+                    gpt_service.stream_scenario(
+                        disease,
+                        purpose,
+                        formatted_patient_info,
+                        summarized_info
+                    ),
+                    patient_info_html
                 )
                 st.session_state['generator_generated_patient_info'] = scenario
                 st.success("환자 정보가 생성되었습니다!")
@@ -356,10 +323,7 @@ def load_page():
                 st.experimental_rerun()
                 
         if 'generator_generated_patient_info' in st.session_state:
-            st.markdown(
-                f'<div style="width: 700px; white-space: pre-wrap;">{st.session_state["generator_generated_patient_info"]}</div>',
-                unsafe_allow_html=True
-            )
+            st.markdown(patient_info_html(st.session_state["generator_generated_patient_info"]), unsafe_allow_html=True)
 
         if st.session_state.get('generator_show_scenario_button'):
             if st.button("환자 시나리오 생성"):
@@ -386,26 +350,22 @@ def load_page():
                 purpose = st.session_state['generator_patient_details'].get('목적', '')
 
                 nursing_service = NursingScenarioService()
-                summary_service = SummaryService()
-                
-                summarized_info = summary_service.summarize_info("\n".join([json.dumps(info, ensure_ascii=False) for info in st.session_state.selected_info]))
-                scenario = nursing_service.create_nursing_scenario(
-                    formatted_patient_info,
-                    purpose,
-                    summarized_info
+                summarized_info = get_summarized_info()
+                placeholder, scenario = render_stream(
+                    nursing_service.stream_nursing_scenario(
+                        formatted_patient_info,
+                        purpose,
+                        summarized_info
+                    ),
+                    scenario_html
                 )
+                # 완성된 시나리오는 아래에서 다시 그린다
+                placeholder.empty()
                 st.session_state['generator_generated_scenario'] = scenario
 
         if 'generator_generated_scenario' in st.session_state:
             scenario = st.session_state["generator_generated_scenario"]
-            formatted_scenario = "\n\n".join(
-                f'<div style="border:1px solid black; padding: 10px; margin-bottom: 20px;">{part.strip()}</div>'
-                for part in scenario.split("\n\n")
-            )
-            st.markdown(
-                f'<div style="width: 700px; white-space: pre-wrap;">{formatted_scenario}</div>',
-                unsafe_allow_html=True
-            )
+            st.markdown(scenario_html(scenario), unsafe_allow_html=True)
 
             with st.expander("시나리오 직접 수정"):
                 edited_scenario = st.text_area("수정할 시나리오 내용을 입력하세요:", value=scenario, height=300)
@@ -420,13 +380,20 @@ def load_page():
 
                 if st.button("수정된 내용 반영하여 재생성"):
                     revision_service = ScenarioRevisionService()
-                    revised_scenario = revision_service.revise_scenario_with_feedback(
+                    # 피드백이 특정 단계를 가리키면 그 단계만 다시 작성한다
+                    revised_scenario, revised_stages = revision_service.revise_stages(
                         st.session_state['generator_generated_scenario'],
-                        feedback
+                        feedback,
+                        st.session_state.get('generator_generated_patient_info', "")
                     )
                     st.session_state['generator_generated_scenario'] = revised_scenario
+                    st.session_state['generator_revised_stages'] = revised_stages
                     st.experimental_rerun()
 
+                revised_stages = st.session_state.pop('generator_revised_stages', None)
+                if revised_stages:
+                    st.info(f"수정된 단계: {', '.join(revised_stages)}")
+
             if st.button("시나리오 저장"):
                 patient_info = st.session_state['generator_generated_patient_details']
                 patient_overview = st.session_state['generator_generated_patient_info']
@@ -0,0 +1,120 @@
+import re
+from collections import namedtuple
+
+# 간호 시나리오의 단계 제목 줄 (예: "1. Initial Stage:", "**3. 2nd state/interval**")
+STAGE_HEADER = re.compile(
+    r'^[ \t#*]*(?:\d+\s*[.)]\s*)?[*\s]*(initial\s+stage|\d+\s*(?:st|nd|rd|th)\s+state\s*/\s*interval)\b[^\n]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# 단계 수를 바꾸거나 전체를 다시 쓰라는 피드백은 단계별 수정으로 처리하지 않는다
+FULL_REVISION_PATTERNS = [
+    r'전체', r'모든\s*단계', r'처음부터', r'단계를?\s*\d+\s*개', r'단계\s*(?:를|을)?\s*(?:추가|삭제|늘|줄)',
+    r'\bentire\b', r'\bwhole\b', r'\ball\s+stages\b', r'\bnumber\s+of\s+stages\b',
+]
+KOREAN_ORDINALS = {"첫": 1, "두": 2, "세": 3, "네": 4, "다섯": 5}
+
+# name: 정규화한 단계 이름, text: 제목 줄부터 다음 단계 직전까지의 원문
+Stage = namedtuple('Stage', ['name', 'text'])
+ParsedScenario = namedtuple('ParsedScenario', ['preamble', 'stages'])
+
+
+def normalize_stage_name(name):
+    name = re.sub(r'\s+', ' ', name.strip().lower())
+    if name.startswith('initial'):
+        return "Initial Stage"
+    number = re.match(r'(\d+)\s*(st|nd|rd|th)', name)
+    return f"{number.group(1)}{number.group(2)} state/interval"
+
+
+def stage_number(name):
+    # Initial Stage는 0, n번째 state/interval은 n
+    match = re.match(r'(\d+)', name)
+    return int(match.group(1)) if match else 0
+
+
+def parse_scenario(text):
+    """ 시나리오를 단계별로 나눈다. 단계를 이어 붙이면(join_scenario) 원문과 같다. """
+    headers = list(STAGE_HEADER.finditer(text))
+    if not headers:
+        return ParsedScenario(text, [])
+    stages = []
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        stages.append(Stage(normalize_stage_name(header.group(1)), text[header.start():end]))
+    return ParsedScenario(text[:headers[0].start()], stages)
+
+
+def join_scenario(parsed):
+    return parsed.preamble + "".join(stage.text for stage in parsed.stages)
+
+
+def detect_target_stages(feedback, parsed):
+    """ 피드백이 가리키는 단계의 위치 목록. 전체 수정이 필요하거나 단계를 특정할 수 없으면 None. """
+    if not parsed.stages:
+        return None
+    lowered = feedback.lower()
+    if any(re.search(pattern, lowered) for pattern in FULL_REVISION_PATTERNS):
+        return None
+
+    names = [stage.name for stage in parsed.stages]
+    targets = set()
+
+    def add_position(position):
+        # 화면에 보이는 번호(1. Initial Stage, 2. 1st state/interval ...) 기준
+        if 1 <= position <= len(names):
+            targets.add(position - 1)
+
+    def add_state(number):
+        for i, name in enumerate(names):
+            if name != "Initial Stage" and stage_number(name) == number:
+                targets.add(i)
+
+    if re.search(r'initial|초기\s*단계|첫\s*(?:번째\s*)?단계|처음\s*단계', lowered):
+        targets.add(names.index("Initial Stage") if "Initial Stage" in names else 0)
+    for match in re.finditer(r'(\d+)\s*(?:st|nd|rd|th)\s*(?:state|interval)', lowered):
+        add_state(int(match.group(1)))
+    # "1차 진단명"처럼 단계가 아닌 항목도 있으므로 "n차" 뒤에 단계 명사가 있을 때만 단계로 본다
+    for match in re.finditer(r'(\d+)\s*차\s*(?:단계|stage|state|interval)', lowered):
+        add_state(int(match.group(1)))
+    for match in re.finditer(r'(?:stage|단계)\s*(\d+)|(\d+)\s*(?:번째\s*)?단계', lowered):
+        add_position(int(match.group(1) or match.group(2)))
+    for word, position in KOREAN_ORDINALS.items():
+        if re.search(rf'{word}\s*번째\s*단계', lowered):
+            add_position(position)
+    if re.search(r'마지막\s*단계|last\s+stage', lowered):
+        add_position(len(names))
+
+    return sorted(targets) or None
+
+
+def stage_outline(parsed, exclude=()):
+    """ 수정하지 않는 단계의 첫 내용 줄만 모은 짧은 맥락. """
+    lines = []
+    for i, stage in enumerate(parsed.stages):
+        if i in exclude:
+            continue
+        body = [line.strip(" -\t") for line in stage.text.splitlines()[1:] if line.strip()]
+        summary = body[0][:100] if body else ""
+        lines.append(f"- {stage.name}: {summary}")
+    return "\n".join(lines)
+
+
+def replace_stages(parsed, replacements):
+    """ replacements({단계 위치: 새 단계 텍스트})를 원래 자리에 끼워 넣는다.
+
+    제목 줄과 단계 뒤의 공백은 원문 것을 유지하므로 번호와 단계 사이 간격이 바뀌지 않는다.
+    """
+    stages = []
+    for i, stage in enumerate(parsed.stages):
+        if i not in replacements:
+            stages.append(stage)
+            continue
+        header, _, _ = stage.text.partition("\n")
+        trailing = stage.text[len(stage.text.rstrip()):] or "\n"
+        # 앞쪽 빈 줄만 지우고 첫 줄의 들여쓰기는 살린다
+        new_text = re.sub(r'^(?:[ \t]*\n)+', '', replacements[i].rstrip())
+        if STAGE_HEADER.match(new_text.partition("\n")[0]):
+            new_text = re.sub(r'^(?:[ \t]*\n)+', '', new_text.partition("\n")[2])
+        stages.append(Stage(stage.name, f"{header}\n{new_text.rstrip()}{trailing}"))
+    return join_scenario(ParsedScenario(parsed.preamble, stages))
@@ -0,0 +1,101 @@
+import difflib
+import json
+import zlib
+from db import connection, fetch_all
+
+# 버전 기록에 남기는 scenarios 컬럼
+VERSIONED_FIELDS = ("id", "patient_info", "patient_overview", "scenario")
+
+
+def make_delta(new_text, old_text):
+    """ new_text에서 old_text를 다시 만드는 줄 단위 역방향 델타.
+
+    [시작, 끝]은 new_text의 줄을 그대로 복사하고, 문자열 목록은 그 줄들을 넣는다.
+    """
+    new_lines = (new_text or "").splitlines(keepends=True)
+    old_lines = (old_text or "").splitlines(keepends=True)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, new_lines, old_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append(old_lines[j1:j2])
+    return delta
+
+
+def apply_delta(new_text, delta):
+    new_lines = (new_text or "").splitlines(keepends=True)
+    old_lines = []
+    for op in delta:
+        if len(op) == 2 and all(isinstance(value, int) for value in op):
+            old_lines.extend(new_lines[op[0]:op[1]])
+        else:
+            old_lines.extend(op)
+    return "".join(old_lines)
+
+
+def encode_version(new_fields, old_fields):
+    """ 바뀐 컬럼만 델타로 남겨 압축한 bytes. 값이 None이던 컬럼은 델타 대신 null로 기록한다. """
+    changes = {}
+    for field in VERSIONED_FIELDS:
+        if new_fields[field] == old_fields[field]:
+            continue
+        changes[field] = None if old_fields[field] is None else make_delta(new_fields[field], old_fields[field])
+    return zlib.compress(json.dumps(changes, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9)
+
+
+def decode_version(data, new_fields):
+    changes = json.loads(zlib.decompress(data).decode("utf-8"))
+    old_fields = dict(new_fields)
+    for field, delta in changes.items():
+        old_fields[field] = None if delta is None else apply_delta(new_fields[field], delta)
+    return old_fields
+
+
+def update_scenario(scenario, new_fields):
+    """ 편집 내용을 scenarios 행에 바로 반영하고 이전 버전의 델타를 남긴다.
+
+    scenario는 편집을 시작할 때 불러온 행(uid, version 포함)이다. 그 사이 다른 곳에서 먼저 저장해
+    version이 바뀌었으면 아무것도 쓰지 않고 False를 반환한다. UPDATE와 델타 INSERT는 한 트랜잭션이다.
+    """
+    old_fields = {field: scenario[field] for field in VERSIONED_FIELDS}
+    new_fields = dict(old_fields, **new_fields)
+    if new_fields == old_fields:
+        return True
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE scenarios SET id = %s, patient_info = %s, patient_overview = %s, scenario = %s, version = version + 1
+            WHERE uid = %s AND version = %s
+            """,
+            (new_fields["id"], new_fields["patient_info"], new_fields["patient_overview"], new_fields["scenario"],
+             scenario["uid"], scenario["version"])
+        )
+        if cursor.rowcount != 1:
+            conn.rollback()
+            cursor.close()
+            return False
+        cursor.execute(
+            "INSERT INTO scenario_versions (scenario_uid, version, delta) VALUES (%s, %s, %s)",
+            (scenario["uid"], scenario["version"], encode_version(new_fields, old_fields))
+        )
+        conn.commit()
+        cursor.close()
+    return True
+
+
+def get_scenario_history(scenario):
+    """ 현재 행에서 델타를 거꾸로 적용해 [(version, 다음 버전으로 바뀐 시각, 컬럼 dict)]를 최신 버전부터 반환한다. """
+    rows = fetch_all(
+        "SELECT version, delta, created_at FROM scenario_versions WHERE scenario_uid = %s ORDER BY version DESC",
+        (scenario["uid"],)
+    )
+    fields = {field: scenario[field] for field in VERSIONED_FIELDS}
+    history = [(scenario["version"], None, fields)]
+    for row in rows:
+        fields = decode_version(row["delta"], fields)
+        history.append((row["version"], row["created_at"], fields))
+    return history
@@ -1,51 +1,31 @@
 import streamlit as st
 import mysql.connector
-from utils import get_db_connection
+from db import fetch_all, execute, pool_stats
+from rate_limiter import rate_limiter_stats
+from vector_index import invalidate_vector_index, row_vector, VECTOR_COLUMNS
+from disease_info import invalidate_disease_ids
 import json
 
 def get_scenarios_from_mariadb():
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM scenarios ORDER BY created_at DESC")
-    scenarios = cursor.fetchall()
-    cursor.close()
-    connection.close()
-    return scenarios
+    return fetch_all("SELECT * FROM scenarios ORDER BY created_at DESC")
 
 def delete_scenarios(scenario_ids):
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
         format_strings = ','.join(['%s'] * len(scenario_ids))
-        cursor.execute(f"DELETE FROM scenarios WHERE id IN ({format_strings})", tuple(scenario_ids))
-        connection.commit()
-        deleted_rows = cursor.rowcount
-        cursor.close()
-        connection.close()
-        return deleted_rows
+        return execute(f"DELETE FROM scenarios WHERE id IN ({format_strings})", tuple(scenario_ids))
     except mysql.connector.Error as err:
         st.error(f"Error: {err}")
         return 0
 
 def get_disease_info_from_mariadb():
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM Disease_info ORDER BY title ASC")
-    disease_info = cursor.fetchall()
-    cursor.close()
-    connection.close()
-    return disease_info
+    return fetch_all(f"SELECT id, title, paragraphs, info, {VECTOR_COLUMNS} FROM Disease_info ORDER BY title ASC")
 
 def delete_disease_info(disease_ids):
     try:
-        connection = get_db_connection()
-        cursor = connection.cursor()
         format_strings = ','.join(['%s'] * len(disease_ids))
-        cursor.execute(f"DELETE FROM Disease_info WHERE id IN ({format_strings})", tuple(disease_ids))
-        connection.commit()
-        deleted_rows = cursor.rowcount
-        cursor.close()
-        connection.close()
+        deleted_rows = execute(f"DELETE FROM Disease_info WHERE id IN ({format_strings})", tuple(disease_ids))
+        invalidate_vector_index()
+        invalidate_disease_ids()
         return deleted_rows
     except mysql.connector.Error as err:
         st.error(f"Error: {err}")
@@ -94,7 +74,7 @@ def load_disease_info_list():
                 for key, value in info_data.items():
                     st.write(f"{key}: {value}")
                 st.write("Vector:")
-                vector_data = json.loads(info['vector'])
+                vector_data = row_vector(info)
                 st.write(vector_data)
         
         if selected_disease_info:
@@ -111,6 +91,10 @@ def load_disease_info_list():
 def main():
     st.sidebar.title("메뉴")
     selection = st.sidebar.radio("보기 선택", ["시뮬레이션 리스트", "Disease Info 리스트"])
+    with st.sidebar.expander("DB 연결 풀"):
+        st.json(pool_stats())
+    with st.sidebar.expander("OpenAI 호출 한도"):
+        st.json(rate_limiter_stats())
 
     if selection == "시뮬레이션 리스트":
         load_simulation_list()
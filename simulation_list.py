@@ -1,126 +1,233 @@
 import streamlit as st
-import mysql.connector
-from fpdf import FPDF
-from datetime import datetime
-from io import BytesIO
 import json
-from utils import get_db_connection, save_scenario_to_mariadb  # 추가된 부분
-
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="scenario",
-        password="Skaqn3301",
-        database="nursing_scenarios"
+import os
+from db import connection, fetch_all, fetch_one
+from scenario_versions import update_scenario, get_scenario_history
+from migrate import pending_scenario_migrations
+from pdf_export import get_cached_pdf, get_pdf_bytes, export_pdf_zip
+
+PAGE_SIZE = 20
+EXPORT_CHUNK_SIZE = 50
+# st.download_button은 ZIP 전체를 메모리(미디어 저장소)에 올리므로 한 번에 내보낼 수 있는 수를 제한한다
+EXPORT_MAX_SCENARIOS = int(os.getenv("PDF_EXPORT_MAX_SCENARIOS", "200"))
+
+# 정렬 옵션 -> ORDER BY 절 (id를 보조 키로 두어 페이지 경계가 흔들리지 않게 한다)
+SORT_OPTIONS = {
+    "Date (Newest First)": "created_at DESC, id DESC",
+    "Date (Oldest First)": "created_at ASC, id ASC",
+    "Title (A-Z)": "disease_name ASC, created_at ASC, id ASC",
+    "Title (Z-A)": "disease_name DESC, created_at DESC, id DESC",
+}
+ALL_DISEASES = "전체"
+# 목록/내보내기에서 읽는 컬럼. 질병명/목적은 id에서 만든 생성 컬럼이다 (python migrate.py scenario-columns)
+LIST_COLUMNS = "id, disease_name, purpose, created_at"
+
+def escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def scenario_filter(search_query="", disease_name=None):
+    # (WHERE 절, 파라미터). 질병명 조건은 (disease_name, created_at) 인덱스로 찾는다
+    conditions, params = [], []
+    if disease_name:
+        conditions.append("disease_name = %s")
+        params.append(disease_name)
+    if search_query:
+        conditions.append("id LIKE %s")
+        params.append(f"%{escape_like(search_query)}%")
+    if not conditions:
+        return "", []
+    return "WHERE " + " AND ".join(conditions), params
+
+def get_disease_names():
+    # 인덱스만 읽는다
+    rows = fetch_all("SELECT DISTINCT disease_name FROM scenarios WHERE disease_name IS NOT NULL ORDER BY disease_name", dictionary=False)
+    return [row[0] for row in rows]
+
+def get_scenario_page(search_query="", sort_option="Date (Newest First)", page=1, page_size=PAGE_SIZE, disease_name=None):
+    """ 검색, 정렬, 페이지 범위를 SQL에서 처리하고 목록에 필요한 컬럼만 가져온다. (행 목록, 전체 개수) 반환 """
+    where, params = scenario_filter(search_query, disease_name)
+    order_by = SORT_OPTIONS.get(sort_option, SORT_OPTIONS["Date (Newest First)"])
+
+    with connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"SELECT COUNT(*) AS total FROM scenarios {where}", params)
+        total = cursor.fetchone()['total']
+        cursor.execute(
+            f"SELECT {LIST_COLUMNS} FROM scenarios {where} ORDER BY {order_by} LIMIT %s OFFSET %s",
+            params + [page_size, (page - 1) * page_size]
+        )
+        scenarios = cursor.fetchall()
+        cursor.close()
+    return scenarios, total
+
+def get_scenario_ids(search_query="", sort_option="Date (Newest First)", disease_name=None):
+    where, params = scenario_filter(search_query, disease_name)
+    order_by = SORT_OPTIONS.get(sort_option, SORT_OPTIONS["Date (Newest First)"])
+    return [row['id'] for row in fetch_all(f"SELECT id FROM scenarios {where} ORDER BY {order_by}", params)]
+
+def scenario_pdf_content(disease_name, purpose, patient_overview, scenario_text):
+    # 상세 페이지와 일괄 내보내기가 같은 내용을 만들어야 PDF 캐시를 함께 쓴다
+    return f"{disease_name} {purpose} 시나리오\n\n환자 개요\n{patient_overview or ''}\n\n시나리오\n{scenario_text or ''}"
+
+def iter_export_documents(scenario_ids, chunk_size=EXPORT_CHUNK_SIZE):
+    """ 내보낼 시나리오의 (PDF 파일 이름, 내용)을 chunk_size개씩 DB에서 읽어 차례로 돌려준다. """
+    for start in range(0, len(scenario_ids), chunk_size):
+        chunk = scenario_ids[start:start + chunk_size]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        rows = fetch_all(f"SELECT {LIST_COLUMNS}, patient_overview, scenario FROM scenarios WHERE id IN ({placeholders})", chunk)
+        rows_by_id = {row['id']: row for row in rows}
+        for scenario_id in chunk:
+            row = rows_by_id.get(scenario_id)
+            if row is None or row['disease_name'] is None:
+                continue
+            date_str = f"{row['created_at']:%Y%m%d%H%M%S}" if row['created_at'] else ""
+            yield (
+                f"{row['disease_name']} {row['purpose']} 시나리오 {date_str}".rstrip() + ".pdf",
+                scenario_pdf_content(row['disease_name'], row['purpose'], row['patient_overview'], row['scenario'])
+            )
+
+def get_scenario_by_id(scenario_id):
+    # 상세 본문은 시나리오를 열 때만 가져온다
+    return fetch_one(
+        f"SELECT uid, version, {LIST_COLUMNS}, patient_info, patient_overview, scenario FROM scenarios WHERE id = %s",
+        (scenario_id,)
     )
 
-def get_scenarios_from_mariadb():
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM scenarios ORDER BY created_at DESC")
-    scenarios = cursor.fetchall()
-    cursor.close()
-    connection.close()
-
-    print("Fetched scenarios from DB:")
-    for scenario in scenarios:
-        print(scenario)
-
-    return scenarios
-
-class PDF(FPDF):
-    def header(self):
-        self.set_font('NanumGothic', '', 13)
-
-    def chapter_title(self, title):
-        self.set_font('NanumGothic', '', 11)
-        self.cell(0, 10, title, 0, 1, 'L')
-        self.ln(10)
-
-    def chapter_body(self, body):
-        self.set_font('NanumGothic', '', 11)
-        self.multi_cell(0, 10, body)
-        self.ln()
-
-    def add_chapter(self, title, body):
-        self.add_page()
-        self.chapter_title(title)
-        self.chapter_body(body)
-
-def create_pdf(content):
-    pdf = PDF()
-    pdf.add_font('NanumGothic', '', 'NanumGothic.ttf', uni=True)
-    pdf.add_chapter('', content)
-    return pdf
+def get_scenario_by_uid(uid):
+    # 편집 중 id(질병명/목적)가 바뀌어도 같은 시나리오를 찾는다
+    return fetch_one(
+        f"SELECT uid, version, {LIST_COLUMNS}, patient_info, patient_overview, scenario FROM scenarios WHERE uid = %s",
+        (uid,)
+    )
+
+def load_scenario_from_session(key):
+    # 목록에서는 id만 저장하므로 처음 열 때 본문을 불러와 세션에 둔다
+    scenario = st.session_state[key]
+    if 'scenario' not in scenario:
+        scenario = get_scenario_by_id(scenario['id'])
+        if scenario is None:
+            return None
+        st.session_state[key] = scenario
+    return scenario
 
 def load_simulation_list():
     st.title("시뮬레이션 리스트")
 
     search_query = st.text_input("Search by Title", "")
-    sort_option = st.selectbox("Sort by", ["Date (Newest First)", "Date (Oldest First)", "Title (A-Z)", "Title (Z-A)"])
-
-    scenarios = get_scenarios_from_mariadb()
+    sort_option = st.selectbox("Sort by", list(SORT_OPTIONS))
+    disease_option = st.selectbox("질병명", [ALL_DISEASES] + get_disease_names())
+    disease_name = None if disease_option == ALL_DISEASES else disease_option
+
+    # 검색어나 정렬이 바뀌면 첫 페이지로 돌아간다
+    if st.session_state.get('sim_list_filter') != (search_query, sort_option, disease_name):
+        st.session_state.sim_list_filter = (search_query, sort_option, disease_name)
+        st.session_state.sim_list_page_number = 1
+    page = st.session_state.get('sim_list_page_number', 1)
+
+    scenarios, total = get_scenario_page(search_query, sort_option, page, disease_name=disease_name)
+    total_pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
+    if page > total_pages:
+        st.session_state.sim_list_page_number = total_pages
+        st.experimental_rerun()
+
+    if 'sim_list_export_ids' not in st.session_state:
+        st.session_state.sim_list_export_ids = set()
+    export_ids = st.session_state.sim_list_export_ids
 
     if scenarios:
-        if search_query:
-            scenarios = [scenario for scenario in scenarios if search_query.lower() in scenario['id'].lower()]
-
-        if sort_option == "Date (Oldest First)":
-            scenarios.sort(key=lambda x: x['created_at'])
-        elif sort_option == "Title (A-Z)":
-            scenarios.sort(key=lambda x: x['id'].lower())
-        elif sort_option == "Title (Z-A)":
-            scenarios.sort(key=lambda x: x['id'].lower(), reverse=True)
-
-        header_cols = st.columns([4, 3, 3, 2, 1, 1])
-        header_cols[0].write("Title")
-        header_cols[1].write("질병명")
-        header_cols[2].write("목적")
-        header_cols[3].write("생성 날짜")
-        header_cols[4].write("View")
-        header_cols[5].write("Edit")
+        header_cols = st.columns([1, 4, 3, 3, 2, 1, 1])
+        header_cols[0].write("선택")
+        header_cols[1].write("Title")
+        header_cols[2].write("질병명")
+        header_cols[3].write("목적")
+        header_cols[4].write("생성 날짜")
+        header_cols[5].write("View")
+        header_cols[6].write("Edit")
 
         for scenario in scenarios:
-            parts = scenario['id'].rsplit('_', 2)
-            if len(parts) == 3:
-                disease_name, purpose, date_str = parts
-                disease_name = disease_name.replace("_", " ")
-                scenario_date = datetime.strptime(date_str, "%Y%m%d%H%M%S").strftime("%Y.%m.%d %H:%M")
-                title = f"{disease_name} {purpose} 시나리오"
-
-                row_cols = st.columns([4, 3, 3, 2, 1, 1])
-                row_cols[0].write(title)
-                row_cols[1].write(disease_name)
-                row_cols[2].write(purpose)
-                row_cols[3].write(scenario_date)
-                if row_cols[4].button("O", key=f"view_{scenario['id']}"):
+            if scenario['disease_name'] is not None:
+                scenario_date = f"{scenario['created_at']:%Y.%m.%d %H:%M}" if scenario['created_at'] else ""
+                title = f"{scenario['disease_name']} {scenario['purpose']} 시나리오"
+
+                row_cols = st.columns([1, 4, 3, 3, 2, 1, 1])
+                # 선택은 페이지를 넘겨도 유지된다
+                if row_cols[0].checkbox("", value=scenario['id'] in export_ids, key=f"sim_list_export_{scenario['id']}"):
+                    export_ids.add(scenario['id'])
+                else:
+                    export_ids.discard(scenario['id'])
+                row_cols[1].write(title)
+                row_cols[2].write(scenario['disease_name'])
+                row_cols[3].write(scenario['purpose'])
+                row_cols[4].write(scenario_date)
+                if row_cols[5].button("O", key=f"view_{scenario['id']}"):
                     st.session_state.sim_list_selected_scenario = scenario
                     st.session_state.sim_list_page = 'scenario_detail'
                     st.experimental_rerun()
-                if row_cols[5].button("O", key=f"edit_{scenario['id']}"):
+                if row_cols[6].button("O", key=f"edit_{scenario['id']}"):
                     st.session_state.edit_scenario = scenario
                     st.session_state.sim_list_page = 'edit_scenario'
                     st.experimental_rerun()
             else:
                 st.error(f"Invalid scenario ID format for document ID: {scenario['id']}")
+
+        nav_cols = st.columns([1, 3, 1])
+        if nav_cols[0].button("이전", disabled=page <= 1, key="sim_list_prev"):
+            st.session_state.sim_list_page_number = page - 1
+            st.experimental_rerun()
+        nav_cols[1].write(f"{page} / {total_pages} 페이지 (총 {total}개)")
+        if nav_cols[2].button("다음", disabled=page >= total_pages, key="sim_list_next"):
+            st.session_state.sim_list_page_number = page + 1
+            st.experimental_rerun()
+
+        export_scenarios(search_query, sort_option, total, disease_name)
     else:
         st.write("저장된 시뮬레이션 시나리오가 없습니다.")
 
+def export_scenarios(search_query, sort_option, total, disease_name=None):
+    with st.expander("PDF 일괄 내보내기"):
+        export_ids = st.session_state.sim_list_export_ids
+        scope = st.radio("내보낼 시나리오", [f"선택한 시나리오 ({len(export_ids)}개)", f"현재 검색 결과 전체 ({total}개)"], key="sim_list_export_scope")
+        selected_only = scope.startswith("선택한")
+        export_count = len(export_ids) if selected_only else total
+        too_many = export_count > EXPORT_MAX_SCENARIOS
+        if too_many:
+            st.warning(f"한 번에 최대 {EXPORT_MAX_SCENARIOS}개까지 내보낼 수 있습니다. 검색이나 선택으로 범위를 줄여주세요.")
+
+        cols = st.columns([1, 1, 3])
+        if cols[1].button("선택 해제", disabled=not export_ids, key="sim_list_export_clear"):
+            for scenario_id in export_ids:
+                st.session_state.pop(f"sim_list_export_{scenario_id}", None)
+            export_ids.clear()
+            st.experimental_rerun()
+
+        if cols[0].button("ZIP 만들기", disabled=export_count == 0 or too_many, key="sim_list_export_zip"):
+            scenario_ids = sorted(export_ids) if selected_only else get_scenario_ids(search_query, sort_option, disease_name)
+            # 버튼을 누르는 사이 검색 결과가 늘었을 수 있다
+            scenario_ids = scenario_ids[:EXPORT_MAX_SCENARIOS]
+            with st.spinner(f"{len(scenario_ids)}개 시나리오의 PDF를 만드는 중..."):
+                try:
+                    zip_path = export_pdf_zip(iter_export_documents(scenario_ids))
+                except Exception as e:
+                    st.error(f"PDF 내보내기에 실패했습니다: {e}")
+                    return
+            try:
+                with open(zip_path, "rb") as f:
+                    st.download_button("ZIP 다운로드", data=f, file_name="scenarios.zip", mime="application/zip", key="sim_list_export_download")
+            finally:
+                os.remove(zip_path)
+
 def load_scenario_detail():
     if 'sim_list_selected_scenario' in st.session_state:
-        scenario = st.session_state.sim_list_selected_scenario
-
-        print("Selected scenario for detail view:")
-        print(scenario)
-        
-        parts = scenario['id'].rsplit('_', 2)
-        if len(parts) == 3:
-            disease_name, purpose, date_str = parts
-            disease_name = disease_name.replace("_", " ")
-            title = f"{disease_name} {purpose} 시나리오"
-        else:
+        scenario = load_scenario_from_session('sim_list_selected_scenario')
+        if scenario is None:
+            st.error("시나리오를 찾을 수 없습니다.")
+            return
+
+        if scenario['disease_name'] is None:
             st.error("Invalid scenario ID format.")
             return
+        disease_name, purpose = scenario['disease_name'], scenario['purpose']
+        title = f"{disease_name} {purpose} 시나리오"
 
         st.title(title)
 
@@ -146,27 +253,30 @@ def load_scenario_detail():
                 st.experimental_rerun()
 
         with col3:
-            content = f"{disease_name} {purpose} 시나리오\n\n환자 개요\n{patient_overview}\n\n시나리오\n{scenario_text}"
-            pdf = create_pdf(content)
-            pdf_output = BytesIO()
-            pdf.output(pdf_output)
-            pdf_output.seek(0)
-            st.download_button(label="PDF 다운로드", data=pdf_output, file_name=f"{disease_name} {purpose} 시나리오.pdf", mime="application/pdf")
+            content = scenario_pdf_content(disease_name, purpose, patient_overview, scenario_text)
+            # PDF는 요청할 때만 만들고, 같은 내용이면 캐시된 것을 바로 내려준다
+            pdf_bytes = get_cached_pdf(content)
+            if pdf_bytes is None and st.button("PDF 만들기"):
+                pdf_bytes = get_pdf_bytes(content)
+            if pdf_bytes is not None:
+                st.download_button(label="PDF 다운로드", data=pdf_bytes, file_name=f"{disease_name} {purpose} 시나리오.pdf", mime="application/pdf")
     else:
         st.write("선택된 시나리오가 없습니다.")
 
 def load_edit_scenario():
     if 'edit_scenario' in st.session_state:
-        scenario = st.session_state.edit_scenario
-        
-        parts = scenario['id'].rsplit('_', 2)
-        if len(parts) == 3:
-            old_disease_name, old_purpose, date_str = parts
-            old_disease_name = old_disease_name.replace("_", " ")
-            title = f"Edit {old_disease_name} {old_purpose} 시나리오"
-        else:
+        scenario = load_scenario_from_session('edit_scenario')
+        if scenario is None:
+            st.error("시나리오를 찾을 수 없습니다.")
+            return
+
+        if scenario['disease_name'] is None:
             st.error("Invalid scenario ID format.")
             return
+        old_disease_name, old_purpose = scenario['disease_name'], scenario['purpose']
+        # 새 id에도 원래 id의 생성 시각을 그대로 쓴다
+        date_str = scenario['id'].rsplit('_', 1)[1]
+        title = f"Edit {old_disease_name} {old_purpose} 시나리오"
 
         st.title(title)
 
@@ -186,17 +296,21 @@ def load_edit_scenario():
                 st.error("Invalid patient info format.")
                 return
 
-            # 새 시나리오 저장
-            save_scenario_to_mariadb(new_patient_info, new_scenario_text, new_id, new_patient_overview)  # 네 개의 인자 전달
-
-            # 기존 시나리오 삭제
-            connection = get_db_connection()
-            cursor = connection.cursor()
-            delete_query = "DELETE FROM scenarios WHERE id = %s"
-            cursor.execute(delete_query, (scenario['id'],))
-            connection.commit()
-            cursor.close()
-            connection.close()
+            # 같은 행을 UPDATE 한 번으로 고치고 이전 버전은 델타로 남긴다
+            saved = update_scenario(scenario, {
+                "id": new_id,
+                "patient_info": json.dumps(new_patient_info, ensure_ascii=False),
+                "patient_overview": new_patient_overview,
+                "scenario": new_scenario_text,
+            })
+            if not saved:
+                latest = get_scenario_by_uid(scenario['uid'])
+                if latest is None:
+                    st.error("시나리오가 삭제되어 저장하지 못했습니다.")
+                    return
+                st.session_state.edit_scenario = latest
+                st.error("편집하는 동안 다른 곳에서 먼저 수정되어 저장하지 않았습니다. 최신 내용을 불러왔으니 확인 후 다시 저장하세요.")
+                return
 
             st.success("시나리오가 업데이트되었습니다.")
             st.session_state.sim_list_page = 'simulation_list'
@@ -205,10 +319,27 @@ def load_edit_scenario():
         if st.button("Cancel"):
             st.session_state.sim_list_page = 'simulation_list'
             st.experimental_rerun()
+
+        with st.expander("이전 버전"):
+            history = get_scenario_history(scenario)
+            if len(history) == 1:
+                st.write("수정 기록이 없습니다.")
+            for version, replaced_at, fields in history[1:]:
+                st.write(f"**버전 {version}** ({replaced_at:%Y.%m.%d %H:%M}까지)")
+                st.text(fields["scenario"] or "")
     else:
         st.write("선택된 시나리오가 없습니다.")
 
+def show_pending_migrations():
+    # 컬럼이 없으면 쿼리마다 Unknown column 에러가 나므로 먼저 안내한다
+    pending = pending_scenario_migrations()
+    for command in pending:
+        st.error(f"데이터베이스 마이그레이션이 필요합니다: python migrate.py {command}")
+    return bool(pending)
+
 def load_page():
+    if show_pending_migrations():
+        return
     if 'sim_list_page' not in st.session_state:
         st.session_state.sim_list_page = 'simulation_list'
 
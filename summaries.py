@@ -0,0 +1,37 @@
+import json
+import streamlit as st
+from GPT_api import SummaryService
+from disk_cache import DiskCache
+
+SUMMARY_MAX_LENGTH = 500
+SUMMARY_INPUT_MAX_LENGTH = 1000
+SUMMARY_CACHE_MAX_AGE = 30 * 24 * 3600
+
+
+@st.cache_resource(show_spinner=False)
+def get_summary_cache():
+    return DiskCache("summaries", max_entries=5000, max_age=SUMMARY_CACHE_MAX_AGE)
+
+
+def summary_key(disease_ids, max_length):
+    return json.dumps([sorted(disease_ids), max_length])
+
+
+def summarize_selected_info(selected_info, max_length=SUMMARY_MAX_LENGTH):
+    """ 선택된 Disease_info 행들의 요약. (id 목록, 길이 제한)이 같으면 세션과 프로세스를 넘어 재사용한다. """
+    selected = {info['id']: info for info in selected_info}
+    if not selected:
+        return ""
+
+    disease_ids = sorted(selected)
+    key = summary_key(disease_ids, max_length)
+    cache = get_summary_cache()
+    summarized_info = cache.get(key)
+    if summarized_info is None:
+        selected_info_text = "\n".join(json.dumps(selected[disease_id], ensure_ascii=False) for disease_id in disease_ids)
+        # 선택된 정보가 너무 많으면 자르기
+        if len(selected_info_text) > SUMMARY_INPUT_MAX_LENGTH:
+            selected_info_text = selected_info_text[:SUMMARY_INPUT_MAX_LENGTH] + '...'
+        summarized_info = SummaryService().summarize_info(selected_info_text, max_length=max_length)
+        cache.set(key, summarized_info)
+    return summarized_info
@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import batch_generate
+
+
+class AssignIdsTest(unittest.TestCase):
+    """ assign_ids가 DB에 이미 있는 id를 피해 시각을 고르는지 확인한다. """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.checkpoint = batch_generate.Checkpoint(os.path.join(self.tmpdir.name, "checkpoint.jsonl"))
+        self.ids = set()
+
+    def fetch_all(self, query, params=(), dictionary=True):
+        start, end = params
+        return [(id_,) for id_ in sorted(self.ids) if start <= id_ <= end]
+
+    def record(self, i):
+        return {"key": f"k{i}", "disease_name": "폐렴", "purpose": "교육", "patient_info": {}, "scenario": f"s{i}"}
+
+    def test_skips_ids_already_in_db_beyond_first_window(self):
+        # 지금부터 20초 전까지 모든 시각이 이미 쓰였다
+        now = datetime.now().replace(microsecond=0)
+        for seconds in range(-5, 21):
+            self.ids.add("폐렴_교육_" + (now - timedelta(seconds=seconds)).strftime(batch_generate.ID_TIME_FORMAT))
+        records = [self.record(i) for i in range(3)]
+        with mock.patch.object(batch_generate, "fetch_all", self.fetch_all):
+            batch_generate.assign_ids(self.checkpoint, records)
+
+        assigned = [record["id"] for record in records]
+        self.assertEqual(len(set(assigned)), len(records))
+        self.assertFalse(set(assigned) & self.ids)
+        for record in records:
+            self.assertTrue(record["id"].endswith(datetime.strptime(
+                record["created_at"], "%Y-%m-%d %H:%M:%S").strftime(batch_generate.ID_TIME_FORMAT)))
+        self.assertEqual(set(self.checkpoint.generated), {"k0", "k1", "k2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from unittest import mock
+
+from mysql.connector.errors import OperationalError
+
+import db
+
+
+class LostConnection:
+    def is_connected(self):
+        return True
+
+    def rollback(self):
+        raise OperationalError("Lost connection to MySQL server during query")
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    """ 블록 안에서 난 에러는 롤백이 실패해도 그대로 올라오고 연결은 반납된다. """
+
+    def test_failed_rollback_keeps_original_error(self):
+        conn = LostConnection()
+        with mock.patch.object(db.pooling, "MySQLConnectionPool") as pool_class:
+            pool_class.return_value.get_connection.return_value = conn
+            pool = db.ConnectionPool(size=1, timeout=0.1)
+        with self.assertRaises(KeyError):
+            with pool.connection():
+                raise KeyError("original")
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.get_stats()["in_use"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
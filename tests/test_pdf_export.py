@@ -0,0 +1,47 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from fpdf import FPDF
+
+import disk_cache
+import pdf_export
+
+
+class PreloadedFontTest(unittest.TestCase):
+    """ 한글 폰트는 프로세스에서 레이아웃마다 한 번만 파싱한다. """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        with mock.patch.object(disk_cache, "CACHE_DIR", self.tmpdir.name):
+            cache = disk_cache.DiskCache("pdfs")
+        for target, value in [("_templates", {}), ("_cache", cache)]:
+            patcher = mock.patch.object(pdf_export, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_add_font_runs_once_across_renders(self):
+        with mock.patch.object(FPDF, "add_font", autospec=True, side_effect=FPDF.add_font) as add_font:
+            for i in range(3):
+                for layout in pdf_export.LAYOUTS:
+                    self.assertTrue(pdf_export.get_pdf_bytes(f"시나리오 {i}\n내용", layout).startswith(b"%PDF-"))
+        self.assertEqual(add_font.call_count, len(pdf_export.LAYOUTS))
+
+    def test_copied_documents_match_fresh_ones(self):
+        fixed = pdf_export.datetime(2024, 1, 1, tzinfo=pdf_export.timezone.utc)
+        fresh = FPDF(orientation="P", unit="mm", format="A4")
+        fresh.add_font(pdf_export.FONT_FAMILY, '', pdf_export.FONT_PATH)
+        documents = [fresh, pdf_export.new_document(orientation="P", unit="mm", format="A4")]
+        outputs = []
+        for pdf in documents:
+            pdf.set_creation_date(fixed)
+            pdf.add_page()
+            pdf.set_font(pdf_export.FONT_FAMILY, size=12)
+            pdf.multi_cell(0, 10, "간호 시뮬레이션")
+            outputs.append(bytes(pdf.output()))
+        self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from mock_llm_server import NURSING_SCENARIO_RESPONSE
+from scenario_stages import detect_target_stages, join_scenario, parse_scenario, replace_stages
+
+
+class DetectTargetStagesTest(unittest.TestCase):
+    """ 피드백 문장에서 수정할 단계 위치를 찾는다 (0: Initial Stage, n: n번째 state/interval). """
+
+    def setUp(self):
+        self.parsed = parse_scenario(NURSING_SCENARIO_RESPONSE)
+
+    def test_parse_round_trip(self):
+        self.assertEqual(len(self.parsed.stages), 4)
+        self.assertEqual(join_scenario(self.parsed), NURSING_SCENARIO_RESPONSE)
+
+    def test_targets(self):
+        cases = {
+            "초기 단계의 활력징후를 더 나쁘게 해줘": [0],
+            "2nd state/interval에서 혈압을 낮춰줘": [2],
+            "2차 단계 교육 포인트를 바꿔줘": [2],
+            "3번째 단계를 자세히": [2],
+            "마지막 단계에 퇴원 교육 추가": [3],
+        }
+        for feedback, expected in cases.items():
+            with self.subTest(feedback=feedback):
+                self.assertEqual(detect_target_stages(feedback, self.parsed), expected)
+
+    def test_full_revision(self):
+        cases = [
+            "1차 진단명을 바꿔줘",
+            "전체적으로 더 어렵게 만들어줘",
+            "단계를 5개로 늘려줘",
+            "환자 나이를 80세로 바꿔줘",
+        ]
+        for feedback in cases:
+            with self.subTest(feedback=feedback):
+                self.assertIsNone(detect_target_stages(feedback, self.parsed))
+
+    def test_replace_keeps_other_stages(self):
+        revised = replace_stages(self.parsed, {1: "  - 환자 상태: 수정됨."})
+        stages = parse_scenario(revised).stages
+        self.assertEqual(stages[1].text.splitlines()[1], "  - 환자 상태: 수정됨.")
+        self.assertEqual([stage.text for i, stage in enumerate(stages) if i != 1],
+                         [stage.text for i, stage in enumerate(self.parsed.stages) if i != 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
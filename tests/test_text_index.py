@@ -0,0 +1,52 @@
+import json
+import unittest
+
+import numpy as np
+
+from text_index import DiseaseTextIndex
+from vector_index import DiseaseVectorIndex
+
+
+def disease_row(disease_id, title, paragraph, info=None):
+    return {"id": disease_id, "title": title, "paragraphs": json.dumps([paragraph]), "info": json.dumps(info or {})}
+
+
+class DiseaseTextIndexTest(unittest.TestCase):
+    """ posting만으로 구한 (위치, 등장 횟수)가 str.count와 같은지 확인한다. """
+
+    def setUp(self):
+        self.rows = [
+            disease_row(1, "Pneumonia", "Pneumonia is a lung infection. Viral pneumonia is common.", {"Risk": "smoking"}),
+            disease_row(2, "Diabetes", "Diabetes mellitus. Type 2 diabetes.", {"Note": "aaaa aaa"}),
+            disease_row(3, "Asthma", "Chronic airway inflammation, not pneumonia."),
+        ]
+        self.index = DiseaseTextIndex(self.rows)
+
+    def assert_matches_count(self, query, field="content"):
+        texts = self.index.titles if field == "title" else self.index.contents
+        expected = [(i, text.count(query.lower())) for i, text in enumerate(texts) if query.lower() in text]
+        positions, counts = self.index.search(query, field)
+        self.assertEqual(list(zip(positions.tolist(), counts.tolist())), expected)
+
+    def test_counts_match_substring_counts(self):
+        for query in ["pneumonia", "PNEU", "dia", "diabete", "ion", "a", "smoking", "lung  infection", "xyz"]:
+            with self.subTest(query=query):
+                self.assert_matches_count(query)
+        self.assert_matches_count("asth", field="title")
+
+    def test_overlapping_query_counts_like_str_count(self):
+        for query in ["aaa", "aaaa", "aa a"]:
+            with self.subTest(query=query):
+                self.assert_matches_count(query)
+
+    def test_rows_without_vectors_are_keyword_searchable(self):
+        vectors = [np.array([1.0, 0.0], dtype=np.float32), None, None]
+        index = DiseaseVectorIndex(self.rows, vectors)
+        positions, counts = index.text.search("pneumonia")
+        self.assertEqual(positions.tolist(), [0, 2])
+        self.assertEqual(index.scores(np.array([1.0, 0.0]), positions).tolist(), [1.0, 0.0])
+        self.assertEqual(index.search(np.array([1.0, 0.0]), 0.5)[0].tolist(), [0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import socket
+import tempfile
+import unittest
+from unittest import mock
+
+import disk_cache
+import translation
+from mock_deepl_server import MockDeepLConfig, start_mock_server
+
+
+class TranslationTest(unittest.TestCase):
+    """ translate_to_english / seed_disease_dictionary를 모의 DeepL 서버(mock_deepl_server.py)로 확인한다. """
+
+    def setUp(self):
+        self.server = start_mock_server()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        with mock.patch.object(disk_cache, "CACHE_DIR", self.tmpdir.name):
+            cache = disk_cache.DiskCache("translations")
+
+        self.dictionary = {}
+        for target, value in [
+            ("DEEPL_API_URL", self.server.url),
+            ("DEEPL_AUTH_KEY", "test-key"),
+            ("get_translation_cache", lambda: cache),
+            ("get_disease_dictionary", lambda: self.dictionary),
+        ]:
+            patcher = mock.patch.object(translation, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_dictionary_hit_makes_no_request(self):
+        self.dictionary["폐렴"] = "Pneumonia"
+        self.assertEqual(translation.translate_to_english(" 폐렴 "), "Pneumonia")
+        self.assertEqual(self.server.requests, [])
+
+    def test_translation_is_cached_after_first_request(self):
+        self.assertEqual(translation.translate_to_english("심근경색"), "Myocardial infarction")
+        self.assertEqual(translation.translate_to_english("심근경색  "), "Myocardial infarction")
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertIn(("text", "심근경색"), self.server.requests[0])
+
+    def test_http_error_returns_original_text(self):
+        self.server.config = MockDeepLConfig(status=503)
+        self.assertEqual(translation.translate_to_english("뇌졸중"), "뇌졸중")
+        # 실패한 응답은 캐시하지 않는다
+        self.server.config = MockDeepLConfig()
+        self.assertEqual(translation.translate_to_english("뇌졸중"), "Stroke")
+
+    def test_unreachable_server_returns_original_text(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed_port = sock.getsockname()[1]
+        with mock.patch.object(translation, "DEEPL_API_URL", f"http://127.0.0.1:{closed_port}/v2/translate"):
+            self.assertEqual(translation.translate_to_english("당뇨병"), "당뇨병")
+
+    def test_unset_auth_key_skips_request(self):
+        with mock.patch.object(translation, "DEEPL_AUTH_KEY", ""), \
+                mock.patch.object(translation, "_missing_key_warned", False), \
+                mock.patch.object(translation.st, "warning") as warning:
+            self.assertEqual(translation.translate_to_english("폐렴"), "폐렴")
+            self.assertEqual(translation.translate_to_english("뇌졸중"), "뇌졸중")
+        self.assertEqual(self.server.requests, [])
+        warning.assert_called_once()
+
+    def test_seed_builds_korean_dictionary(self):
+        path = os.path.join(self.tmpdir.name, "disease_dictionary.json")
+        rows = [("Pneumonia",), ("Stroke",)]
+        with mock.patch.object(translation, "fetch_all", return_value=rows):
+            translation.seed_disease_dictionary(path, batch_size=1)
+        with open(path, "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"폐렴": "Pneumonia", "뇌졸중": "Stroke"})
+        self.assertEqual(len(self.server.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+
+NGRAM = 3
+
+
+def content_text(row):
+    # 검색 대상 본문: paragraphs + info 값 (기존 검색과 같은 방식으로 합친다)
+    paragraphs_text = " ".join(json.loads(row['paragraphs']))
+    info_text = " ".join(str(value) for key, value in json.loads(row['info']).items())
+    return (paragraphs_text + " " + info_text).lower()
+
+
+def text_codes(text):
+    # 유니코드 코드 포인트 배열 (str 인덱스와 같은 단위)
+    return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype='<u4').astype(np.int64)
+
+
+def gram_keys(codes):
+    # 이어진 세 글자(코드 포인트는 21비트)를 int64 키 하나로 만든다
+    return (codes[:-2] << 42) | (codes[1:-1] << 21) | codes[2:]
+
+
+def smallest_period(text):
+    # text가 자기 자신과 겹쳐 나타날 수 있는 가장 작은 간격 ("aaa" -> 1). 겹칠 수 없으면 len(text)
+    for period in range(1, len(text)):
+        if text[period:] == text[:-period]:
+            return period
+    return len(text)
+
+
+class NgramPostings:
+    """ 문자 3-gram -> 문서별 등장 횟수와 문서 안 오프셋.
+
+    3-gram 키 순으로 정렬한 배열 몇 개로만 보관한다. 한 3-gram의 (문서, 등장 횟수) 쌍은
+    grams[i]의 구간 gram_starts[i]:gram_starts[i + 1]에 문서 순서로 있고, 각 쌍의 오프셋은
+    offsets[pair_starts[j]:pair_starts[j] + pair_counts[j]]에 있다.
+    """
+
+    def __init__(self, texts):
+        keys = [np.zeros(0, dtype=np.int64)]
+        documents = [np.zeros(0, dtype=np.int32)]
+        offsets = [np.zeros(0, dtype=np.int32)]
+        for position, text in enumerate(texts):
+            if len(text) < NGRAM:
+                continue
+            text_keys = gram_keys(text_codes(text))
+            keys.append(text_keys)
+            documents.append(np.full(len(text_keys), position, dtype=np.int32))
+            offsets.append(np.arange(len(text_keys), dtype=np.int32))
+        keys = np.concatenate(keys)
+        # 안정 정렬이라 같은 3-gram 안에서는 (문서, 오프셋) 순서가 그대로 남는다
+        order = np.argsort(keys, kind='stable')
+        keys, documents, self.offsets = keys[order], np.concatenate(documents)[order], np.concatenate(offsets)[order]
+
+        changed = np.ones(len(keys), dtype=bool)
+        changed[1:] = (keys[1:] != keys[:-1]) | (documents[1:] != documents[:-1])
+        pair_starts = np.flatnonzero(changed)
+        self.pair_starts = pair_starts
+        self.pair_documents = documents[pair_starts]
+        self.pair_counts = np.diff(np.r_[pair_starts, len(keys)]).astype(np.int32)
+        pair_keys = keys[pair_starts]
+        changed = np.ones(len(pair_keys), dtype=bool)
+        changed[1:] = pair_keys[1:] != pair_keys[:-1]
+        gram_starts = np.flatnonzero(changed)
+        self.grams = pair_keys[gram_starts]
+        self.gram_starts = np.r_[gram_starts, len(pair_keys)]
+
+    def pairs(self, key):
+        """ 3-gram 키의 (문서, 등장 횟수) 쌍 구간. 색인에 없으면 None """
+        i = np.searchsorted(self.grams, key)
+        if i == len(self.grams) or self.grams[i] != key:
+            return None
+        return slice(self.gram_starts[i], self.gram_starts[i + 1])
+
+    def offsets_in(self, pairs, candidates):
+        """ pairs 구간에서 candidates 문서(모두 구간에 있어야 한다)의 (문서 위치, 오프셋) 배열 """
+        selected = pairs.start + np.searchsorted(self.pair_documents[pairs], candidates)
+        counts = self.pair_counts[selected]
+        ends = np.cumsum(counts)
+        occurrences = np.repeat(self.pair_starts[selected] - (ends - counts), counts) + np.arange(ends[-1] if len(ends) else 0)
+        return np.repeat(candidates.astype(np.int64), counts), self.offsets[occurrences].astype(np.int64)
+
+
+class DiseaseTextIndex:
+    """ Disease_info 제목/본문의 문자 3-gram 위치 역색인.
+
+    posting은 3-gram마다 문서별 등장 횟수와 오프셋을 미리 계산해 둔다(NgramPostings).
+    질의의 3-gram 오프셋이 나란히 이어지는 곳만 매칭이므로, 문서 본문을 다시 읽지 않고
+    posting만으로 포함 여부와 등장 횟수를 구한다. 비용이 코퍼스 크기가 아니라 매칭 수에 비례한다.
+    질의별 (위치, 등장 횟수) 결과는 LRU로 보관해 같은 질의는 다시 계산하지 않는다.
+    """
+
+    def __init__(self, rows, cache_size=256):
+        self.titles = [row['title'].lower() for row in rows]
+        self.contents = [content_text(row) for row in rows]
+        self.title_postings = NgramPostings(self.titles)
+        self.content_postings = NgramPostings(self.contents)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _scan(query, texts):
+        # 3글자 미만 질의는 색인으로 좁힐 수 없어 모든 문서를 확인한다
+        counts = np.array([text.count(query) for text in texts], dtype=np.int64)
+        positions = np.flatnonzero(counts)
+        return positions, counts[positions]
+
+    @staticmethod
+    def _match(query, postings):
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        pairs = [postings.pairs(key) for key in gram_keys(text_codes(query)).tolist()]
+        if any(gram_pairs is None for gram_pairs in pairs):
+            return empty
+        period = smallest_period(query)
+        if len(pairs) == 1 and period == len(query):
+            # 3글자 질의는 posting의 등장 횟수가 곧 결과다
+            return postings.pair_documents[pairs[0]].astype(np.int64), postings.pair_counts[pairs[0]].astype(np.int64)
+
+        # 후보 문서: 가장 짧은 posting부터 문서 위치를 교집합한다
+        order = sorted(range(len(pairs)), key=lambda i: pairs[i].stop - pairs[i].start)
+        candidates = postings.pair_documents[pairs[order[0]]]
+        for i in order[1:]:
+            candidates = np.intersect1d(candidates, postings.pair_documents[pairs[i]], assume_unique=True)
+            if not len(candidates):
+                return empty
+
+        # 후보 문서 안에서 질의 시작 오프셋(문서 위치 << 32 | 오프셋)이 모든 3-gram에서 맞는 곳만 남긴다
+        starts = None
+        for i in order:
+            documents, offsets = postings.offsets_in(pairs[i], candidates)
+            keys = (documents << 32) + (offsets - i)
+            starts = keys if starts is None else np.intersect1d(starts, keys, assume_unique=True)
+            if not len(starts):
+                return empty
+
+        documents = starts >> 32
+        if period == len(query):
+            return np.unique(documents, return_counts=True)
+        # 자기 자신과 겹칠 수 있는 질의는 str.count처럼 겹치지 않는 등장만 센다
+        counts = {}
+        last = {}
+        for document, offset in zip(documents.tolist(), (starts & 0xFFFFFFFF).tolist()):
+            if offset >= last.get(document, -len(query)) + len(query):
+                counts[document] = counts.get(document, 0) + 1
+                last[document] = offset
+        return np.array(list(counts), dtype=np.int64), np.array(list(counts.values()), dtype=np.int64)
+
+    def search(self, query, field='content'):
+        """ query를 포함하는 문서의 (위치 배열, 등장 횟수 배열)을 반환한다. field: 'content' 또는 'title' """
+        query = query.lower()
+        if not query:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        key = (field, query)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        texts, postings = (self.titles, self.title_postings) if field == 'title' else (self.contents, self.content_postings)
+        result = self._scan(query, texts) if len(query) < NGRAM else self._match(query, postings)
+
+        with self.lock:
+            self.cache[key] = result
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import requests
+import streamlit as st
+from disk_cache import DiskCache
+from db import fetch_all
+
+DEEPL_API_URL = os.getenv("DEEPL_API_URL", 'https://api-free.deepl.com/v2/translate')
+# 비어 있으면 DeepL을 호출하지 않고 번역 전 텍스트를 쓴다
+DEEPL_AUTH_KEY = os.getenv("DEEPL_AUTH_KEY", "")
+DISEASE_DICTIONARY_PATH = os.getenv("DISEASE_DICTIONARY_PATH", "disease_dictionary.json")
+TRANSLATION_CACHE_SIZE = 50000
+TRANSLATION_CACHE_MAX_AGE = 90 * 24 * 3600
+
+_missing_key_warned = False
+
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+
+def contains_hangul(text):
+    return any('\uac00' <= char <= '\ud7a3' for char in text)
+
+
+@st.cache_resource(show_spinner=False)
+def get_translation_cache():
+    return DiskCache("translations", max_entries=TRANSLATION_CACHE_SIZE, max_age=TRANSLATION_CACHE_MAX_AGE)
+
+
+@st.cache_resource(show_spinner=False)
+def get_disease_dictionary():
+    # 한국어 질병명 -> Disease_info 영문 제목 (python translation.py seed 로 생성)
+    if not os.path.exists(DISEASE_DICTIONARY_PATH):
+        return {}
+    with open(DISEASE_DICTIONARY_PATH, "r", encoding="utf-8") as f:
+        return {normalize_text(ko): en for ko, en in json.load(f).items()}
+
+
+def request_translations(texts, source_lang='KO', target_lang='EN'):
+    global _missing_key_warned
+    if not DEEPL_AUTH_KEY:
+        if not _missing_key_warned:
+            _missing_key_warned = True
+            st.warning("DEEPL_AUTH_KEY가 설정되지 않아 번역하지 않고 입력한 텍스트를 그대로 사용합니다.")
+        return None
+
+    params = [('auth_key', DEEPL_AUTH_KEY), ('source_lang', source_lang), ('target_lang', target_lang)]
+    params += [('text', text) for text in texts]
+    try:
+        response = requests.post(DEEPL_API_URL, data=params, verify=False, timeout=10)
+    except requests.RequestException as e:
+        # 번역 서버에 닿지 않으면 호출한 쪽은 번역 전 텍스트를 쓴다
+        st.error(f"Translation request failed: {e}")
+        return None
+
+    # Check if the request was successful
+    if response.status_code != 200:
+        st.error(f"Translation request failed with status code: {response.status_code}")
+        return None
+
+    # Attempt to parse the JSON response
+    try:
+        return [translation["text"] for translation in response.json()['translations']]
+    except (KeyError, IndexError, json.JSONDecodeError) as e:
+        st.error(f"Error parsing translation response: {e}")
+        st.error(f"Response content: {response.content}")
+        return None
+
+
+def translate_to_english(text):
+    """ 한국어 -> 영어 번역. 질병명 사전, 공유 번역 캐시, DeepL API 순서로 찾는다. """
+    key = normalize_text(text)
+    dictionary = get_disease_dictionary()
+    if key in dictionary:
+        return dictionary[key]
+
+    cache = get_translation_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    translations = request_translations([key])
+    if not translations:
+        return text
+    cache.set(key, translations[0])
+    return translations[0]
+
+
+def seed_disease_dictionary(path=DISEASE_DICTIONARY_PATH, batch_size=50):
+    """ Disease_info 제목을 한국어로 한 번 번역해 한국어 -> 영문 제목 사전을 만든다. """
+    rows = fetch_all("SELECT DISTINCT title FROM Disease_info ORDER BY title", dictionary=False)
+    titles = [title for (title,) in rows]
+
+    dictionary = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            dictionary = json.load(f)
+    known_titles = set(dictionary.values())
+    titles = [title for title in titles if title not in known_titles]
+
+    for start in range(0, len(titles), batch_size):
+        batch = titles[start:start + batch_size]
+        translations = request_translations(batch, source_lang='EN', target_lang='KO')
+        if translations is None:
+            break
+        for title, korean in zip(batch, translations):
+            dictionary.setdefault(normalize_text(korean), title)
+        print(f"{min(start + batch_size, len(titles))}/{len(titles)}개 제목 번역 완료")
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dictionary, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return dictionary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="질병명 번역 도구")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = subparsers.add_parser("seed", help="Disease_info 제목으로 한국어 질병명 사전 생성")
+    seed_parser.add_argument("--path", default=DISEASE_DICTIONARY_PATH)
+    seed_parser.add_argument("--batch-size", type=int, default=50)
+
+    args = parser.parse_args()
+    if args.command == "seed":
+        seed_disease_dictionary(args.path, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,10 @@
-import mysql.connector
 import streamlit as st
-import base64
 import json
 from datetime import datetime
-
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="scenario",
-        password="Skaqn3301",
-        database="nursing_scenarios"
-    )
+from db import execute
+from assets import file_base64, get_css
 
 def save_scenario_to_mariadb(patient_info, scenario_text, scenario_id=None, patient_overview=None):
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    
     if scenario_id:
         document_id = scenario_id
     else:
@@ -29,16 +18,32 @@ def save_scenario_to_mariadb(patient_info, scenario_text, scenario_id=None, pati
         INSERT INTO scenarios (id, patient_info, scenario, patient_overview, created_at)
         VALUES (%s, %s, %s, %s, %s)
     """
-    cursor.execute(insert_query, (document_id, patient_info_json, scenario_text, patient_overview, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-    connection.commit()
-    cursor.close()
-    connection.close()
+    execute(insert_query, (document_id, patient_info_json, scenario_text, patient_overview, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+def save_scenarios_to_mariadb(scenarios):
+    """ (id, patient_info, patient_overview, scenario[, created_at]) 목록을 여러 행 INSERT 한 번으로 저장한다.
+
+    created_at을 주지 않은 행은 지금 시각으로 저장한다.
+    """
+    if not scenarios:
+        return 0
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(scenarios))
+    params = []
+    for document_id, patient_info, patient_overview, scenario_text, *created_at in scenarios:
+        params.extend([document_id, json.dumps(patient_info, ensure_ascii=False), patient_overview, scenario_text, created_at[0] if created_at and created_at[0] else now])
+    insert_query = f"""
+        INSERT INTO scenarios (id, patient_info, patient_overview, scenario, created_at)
+        VALUES {placeholders}
+    """
+    return execute(insert_query, params)
+
+def format_patient_info(details):
+    return ", ".join(f"{key}: {('랜덤' if value == '랜덤' else value)}" for key, value in details.items())
 
 def img_to_base64_str(filename):
-    with open(filename, "rb") as image_file:
-        encoded_string = base64.b64encode(image_file.read()).decode()
-    return encoded_string
+    # 파일이 바뀔 때까지 프로세스에서 한 번만 읽는다 (assets.py)
+    return file_base64(filename)
 
 def load_css():
-    with open("style.css", "r", encoding="utf-8") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    st.markdown(get_css("style.css"), unsafe_allow_html=True)
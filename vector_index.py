@@ -0,0 +1,140 @@
+import os
+import numpy as np
+import streamlit as st
+from db import fetch_all
+from ann_index import IVFIndex
+from text_index import DiseaseTextIndex
+
+# Disease_info.vector_blob: little-endian float32 바이너리
+VECTOR_DTYPE = np.dtype('<f4')
+
+# 검색 방식: "exact"(전체 비교) 또는 "ivf"(근사 최근접 이웃)
+SEARCH_MODE = os.getenv("DISEASE_SEARCH_MODE", "exact")
+IVF_N_LISTS = int(os.getenv("DISEASE_IVF_N_LISTS", "0")) or None
+IVF_N_PROBE = int(os.getenv("DISEASE_IVF_N_PROBE", "8"))
+# 이보다 작은 코퍼스는 정확 검색이 더 빠르다
+IVF_MIN_SIZE = 5000
+
+# 변환되지 않은 행만 JSON 벡터를 함께 가져온다
+VECTOR_COLUMNS = "vector_blob, IF(vector_blob IS NULL, vector, NULL) AS vector"
+
+
+def vector_to_blob(vector):
+    return np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()
+
+
+def blob_to_vector(blob):
+    # 복사 없이 DB 바이트를 그대로 읽는다 (읽기 전용 배열)
+    return np.frombuffer(blob, dtype=VECTOR_DTYPE)
+
+
+def json_to_vector(text):
+    # 파이썬 float 리스트를 만들지 않고 "[0.1, 0.2, ...]" 텍스트를 바로 파싱한다
+    return np.fromstring(text.strip()[1:-1], dtype=np.float32, sep=',')
+
+
+def row_vector(row):
+    if row.get('vector_blob') is not None:
+        return blob_to_vector(row['vector_blob'])
+    if row.get('vector'):
+        return json_to_vector(row['vector'])
+    return None
+
+
+def normalize_rows(matrix):
+    # 코사인 유사도를 내적 한 번으로 계산하기 위해 각 행을 단위 벡터로 만든다 (0 벡터는 그대로 둔다)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def normalize_vector(vector):
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector if norm == 0 else vector / norm
+
+
+def cosine_similarities(query_vector, vectors):
+    # sklearn 없이 질의 하나와 여러 벡터의 코사인 유사도를 계산한다
+    if not len(vectors):
+        return np.zeros(0, dtype=np.float32)
+    matrix = normalize_rows(np.vstack(vectors).astype(np.float32))
+    return matrix @ normalize_vector(query_vector)
+
+
+class DiseaseVectorIndex:
+    """ Disease_info 전체를 id 순서의 연속된 float32 행렬, 행 데이터, 텍스트 역색인으로 메모리에 보관한다.
+
+    vectors에서 None인 행(아직 임베딩하지 않은 행)은 0 벡터로 두어 키워드 검색으로만 찾히고 유사도는 0이다.
+    """
+
+    def __init__(self, rows, vectors, search_mode=SEARCH_MODE):
+        self.rows = rows
+        self.ids = np.array([row['id'] for row in rows])
+        self.positions = {row['id']: i for i, row in enumerate(rows)}
+        present = [i for i, vector in enumerate(vectors) if vector is not None]
+        dimension = len(vectors[present[0]]) if present else 0
+        matrix = np.zeros((len(rows), dimension), dtype=np.float32)
+        if present:
+            matrix[present] = np.vstack([vectors[i] for i in present])
+        self.matrix = normalize_rows(matrix)
+        # 키워드 검색용 역색인도 같은 행으로 한 번에 만든다
+        self.text = DiseaseTextIndex(rows)
+        self.ann = None
+        if search_mode == "ivf" and len(present) >= IVF_MIN_SIZE:
+            self.ann = IVFIndex(self.matrix, n_lists=IVF_N_LISTS, n_probe=IVF_N_PROBE)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def row(self, disease_id):
+        position = self.positions.get(disease_id)
+        return None if position is None else self.rows[position]
+
+    def similarities(self, query_vector):
+        # 질의 벡터와 모든 질병 벡터의 코사인 유사도 (행렬-벡터 곱 한 번)
+        if not self.matrix.size:
+            return np.zeros(len(self.rows), dtype=np.float32)
+        return self.matrix @ normalize_vector(query_vector)
+
+    def scores(self, query_vector, positions):
+        # 주어진 위치의 행만 정확한 유사도를 계산한다
+        positions = np.asarray(positions, dtype=np.int64)
+        if not len(positions) or not self.matrix.size:
+            return np.zeros(len(positions), dtype=np.float32)
+        return self.matrix[positions] @ normalize_vector(query_vector)
+
+    def search(self, query_vector, threshold):
+        """ 유사도가 threshold 이상인 (위치, 유사도)를 반환한다. ANN 인덱스가 있으면 근사 검색을 사용한다. """
+        if self.ann is not None:
+            return self.ann.search(normalize_vector(query_vector), threshold=threshold)
+        similarities = self.similarities(query_vector)
+        positions = np.flatnonzero(similarities >= threshold)
+        return positions, similarities[positions]
+
+
+def load_disease_rows():
+    results = fetch_all(f"""
+        SELECT id, title, paragraphs, info, {VECTOR_COLUMNS}
+        FROM Disease_info
+        ORDER BY id
+    """)
+
+    # 벡터가 없는 행도 키워드 검색 대상이므로 빼지 않는다 (벡터는 None)
+    vectors = []
+    for result in results:
+        vectors.append(row_vector(result))
+        del result['vector_blob'], result['vector']
+    return results, vectors
+
+
+# 프로세스 전체에서 한 번만 만들고 모든 세션이 공유한다
+@st.cache_resource(show_spinner=False)
+def get_vector_index():
+    rows, vectors = load_disease_rows()
+    return DiseaseVectorIndex(rows, vectors)
+
+
+def invalidate_vector_index():
+    # Disease_info가 바뀌면 다음 검색에서 인덱스를 다시 만든다
+    get_vector_index.clear()